@@ -1,3 +1,4 @@
+from collections import Counter
 from . import utils
 from loguru import logger
 
@@ -12,31 +13,19 @@ def getBlogs(subject):
 
 
 def getOnlyNewBlogs(blogs):
-    newBlogs = []
-    alreadyReviewedBlogs = utils.getUrlsFromFile(
-        utils.getAbsPath("../storage/reviewedBlogs.txt")
+    alreadyReviewedBlogs = set(
+        utils.getUrlsFromFile(utils.getAbsPath("../storage/reviewedBlogs.txt"))
     )
-    for blog in blogs:
-        if not blog in alreadyReviewedBlogs:
-            newBlogs.append(blog)
-
-    return newBlogs
+    return [blog for blog in blogs if blog not in alreadyReviewedBlogs]
 
 
 if __name__ == "__main__":
     blogs = getBlogs(subject)
-    blogCounts = {}
-    for blog in blogs:
-        blogUrl = utils.getBlogFromUrl(blog)
-        if blogUrl in blogCounts:
-            blogCounts[blogUrl] += 1
-        else:
-            blogCounts[blogUrl] = 1
-
-    sortedBlogCounts = sorted(blogCounts.items(), key=lambda x: x[1], reverse=True)
+    blogCounts = Counter(utils.getBlogFromUrl(blog) for blog in blogs)
+
     newBlogs = [
         f"{blog.replace('scribe.rip', 'medium.com')} ({count})"
-        for blog, count in sortedBlogCounts[:5]
+        for blog, count in blogCounts.most_common(5)
     ]
     logger.info("\n".join(newBlogs))
     addBlogs = input(f"Add top {len(newBlogs)} blogs to reviewed? (default=no): ")
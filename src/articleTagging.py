@@ -438,11 +438,13 @@ class ArticleTagger:
         self, results_by_article: Dict[int, Dict]
     ) -> None:
         """Apply tag evaluation results to articles in the database."""
+        assignments = []
         for article_id, results in results_by_article.items():
             for tag_id in results.get("matches", {}):
-                db.set_article_tag(article_id, tag_id, True)
+                assignments.append((article_id, tag_id, True))
             for tag_id in results.get("non_matches", {}):
-                db.set_article_tag(article_id, tag_id, False)
+                assignments.append((article_id, tag_id, False))
+        db.set_article_tags_bulk(assignments)
 
     def apply_tags_to_articles(self) -> None:
         """Apply content-based tags to articles based on tag definitions."""
@@ -488,6 +490,7 @@ def analyze_tag_results(tag_name: str) -> None:
         return
     matching_articles = db.get_articles_by_tag(tag_name)
     non_matching_articles = db.get_articles_not_matching_tag(tag_name)
+    articleFileFolder = utils.getConfig()["articleFileFolder"]
 
     # Separate matching articles into URLs and non-URLs
     matching_read_urls = []
@@ -495,7 +498,7 @@ def analyze_tag_results(tag_name: str) -> None:
     matching_files = []
 
     for file_name in matching_articles:
-        filePath = os.path.join(utils.getConfig()["articleFileFolder"], file_name)
+        filePath = os.path.join(articleFileFolder, file_name)
         # For HTML and MHTML files, try to get the URL
         print(f"Checking {file_name}")
         print(file_name.lower().endswith((".html", ".mhtml")))
@@ -519,7 +522,7 @@ def analyze_tag_results(tag_name: str) -> None:
     non_matching_files = []
 
     for file_name in non_matching_articles:
-        filePath = os.path.join(utils.getConfig()["articleFileFolder"], file_name)
+        filePath = os.path.join(articleFileFolder, file_name)
         # For HTML and MHTML files, try to get the URL
         if file_name.lower().endswith((".html", ".mhtml")) and os.path.exists(filePath):
             url = utils.getUrlOfArticle(filePath)
@@ -4,7 +4,7 @@ import json
 import hashlib
 import traceback
 from pathlib import Path
-from typing import Dict, List, Tuple, Any, Set, Optional
+from typing import Dict, List, Tuple, Any, Set, Optional, Iterable
 from loguru import logger
 from . import utils
 
@@ -12,6 +12,7 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 STORAGE_DIR = PROJECT_ROOT / "storage"
 DB_FILENAME = "article_summaries.db"
 DB_PATH = STORAGE_DIR / DB_FILENAME
+READ_MMAP_SIZE = 256 * 1024 * 1024
 
 
 def get_db_path() -> str:
@@ -20,49 +21,131 @@ def get_db_path() -> str:
 
 
 def get_connection() -> sqlite3.Connection:
-    return sqlite3.connect(get_db_path())
+    conn = sqlite3.connect(get_db_path())
+    # Foreign key enforcement is per-connection in SQLite, so it is enabled here
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def get_read_connection() -> sqlite3.Connection:
+    """Open a read-only, memory-mapped connection for the tag/search queries."""
+    conn = sqlite3.connect(f"file:{get_db_path()}?mode=ro", uri=True)
+    conn.execute(f"PRAGMA mmap_size = {READ_MMAP_SIZE}")
+    return conn
+
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS article_summaries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_hash TEXT UNIQUE,
+        file_name TEXT UNIQUE,
+        file_format TEXT,
+        summary TEXT,
+        extraction_method TEXT,
+        word_count INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE,
+        description TEXT,
+        use_summary BOOLEAN,
+        any_tags TEXT,
+        all_tags TEXT,
+        not_any_tags TEXT,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS article_tags (
+        article_id INTEGER,
+        tag_id INTEGER,
+        matches BOOLEAN NOT NULL DEFAULT 1,
+        PRIMARY KEY (article_id, tag_id),
+        FOREIGN KEY (article_id) REFERENCES article_summaries(id) ON DELETE CASCADE,
+        FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tag_hashes (
+        tag_id INTEGER PRIMARY KEY,
+        property_hash TEXT,
+        FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_article_summaries_needing_summary
+        ON article_summaries(file_hash, file_name)
+        WHERE summary IS NULL OR summary = ''
+    """,
+)
+
+
+# Child tables whose foreign keys gained ON DELETE CASCADE, mapped to the
+# columns to carry over and the filter that drops rows with missing parents
+CASCADE_MIGRATIONS = {
+    "article_tags": (
+        "article_id, tag_id, matches",
+        "article_id IN (SELECT id FROM article_summaries) AND tag_id IN (SELECT id FROM tags)",
+    ),
+    "tag_hashes": ("tag_id, property_hash", "tag_id IN (SELECT id FROM tags)"),
+}
+
+
+def migrate_to_cascading_foreign_keys(conn: sqlite3.Connection) -> None:
+    """Rebuild child tables created before their foreign keys cascaded on delete."""
+    pending = []
+    for table in CASCADE_MIGRATIONS:
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        ).fetchone()
+        if row and "ON DELETE CASCADE" not in row[0]:
+            pending.append(table)
+    if not pending:
+        return
+
+    # Foreign keys are switched off for the rebuild (the pragma is a no-op inside
+    # a transaction) and every step runs in one transaction, so a crash midway
+    # leaves the old schema intact rather than a half-rebuilt one
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        conn.execute("BEGIN")
+        try:
+            for table in pending:
+                columns, keep_condition = CASCADE_MIGRATIONS[table]
+                logger.info(
+                    f"Rebuilding table '{table}' with ON DELETE CASCADE foreign keys"
+                )
+                create_statement = next(
+                    statement
+                    for statement in SCHEMA
+                    if f"CREATE TABLE IF NOT EXISTS {table} (" in statement
+                )
+                conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+                conn.execute(create_statement)
+                conn.execute(
+                    f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_old WHERE {keep_condition}"
+                )
+                conn.execute(f"DROP TABLE {table}_old")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
 
 
 def setup_database() -> str:
     db_path = get_db_path()
     with get_connection() as conn:
-        conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS article_summaries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_hash TEXT UNIQUE,
-                file_name TEXT UNIQUE,
-                file_format TEXT,
-                summary TEXT,
-                extraction_method TEXT,
-                word_count INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            CREATE TABLE IF NOT EXISTS tags (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                description TEXT,
-                use_summary BOOLEAN,
-                any_tags TEXT,
-                all_tags TEXT,
-                not_any_tags TEXT,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            CREATE TABLE IF NOT EXISTS article_tags (
-                article_id INTEGER,
-                tag_id INTEGER,
-                matches BOOLEAN NOT NULL DEFAULT 1,
-                PRIMARY KEY (article_id, tag_id),
-                FOREIGN KEY (article_id) REFERENCES article_summaries(id),
-                FOREIGN KEY (tag_id) REFERENCES tags(id)
-            );
-            CREATE TABLE IF NOT EXISTS tag_hashes (
-                tag_id INTEGER PRIMARY KEY,
-                property_hash TEXT,
-                FOREIGN KEY (tag_id) REFERENCES tags(id)
-            );
-            """
-        )
+        for statement in SCHEMA:
+            conn.execute(statement)
+        migrate_to_cascading_foreign_keys(conn)
     return db_path
 
 
@@ -223,22 +306,8 @@ def get_all_file_hashes() -> List[str]:
 
 def get_articles_needing_summary() -> List[Tuple[str, str]]:
     with get_connection() as conn:
-        # First, let's check if there are any inconsistencies in the data
         cursor = conn.execute(
-            "SELECT COUNT(*) FROM article_summaries WHERE summary IS NOT NULL AND summary != '' AND summary != 'failed_to_summarise' AND summary != 'failed_to_extract'"
-        )
-        summarized_count = cursor.fetchone()[0]
-
-        cursor = conn.execute("SELECT COUNT(*) FROM article_summaries")
-        total_count = cursor.fetchone()[0]
-
-        logger.debug(
-            f"Database has {total_count} total articles, {summarized_count} with summaries"
-        )
-
-        # Get articles that truly need summarization
-        cursor = conn.execute(
-            "SELECT file_hash, file_name FROM article_summaries WHERE summary IS NULL OR summary = '' OR (summary != 'failed_to_summarise' AND summary != 'failed_to_extract' AND summary = '')"
+            "SELECT file_hash, file_name FROM article_summaries WHERE summary IS NULL OR summary = ''"
         )
         return cursor.fetchall()
 
@@ -252,10 +321,6 @@ def remove_nonexistent_files(existing_files: Set[str]) -> int:
             if file_name not in existing_files
         ]
         if files_to_remove:
-            for file_id in files_to_remove:
-                conn.execute(
-                    "DELETE FROM article_tags WHERE article_id = ?", (file_id,)
-                )
             placeholders = ",".join("?" for _ in files_to_remove)
             conn.execute(
                 f"DELETE FROM article_summaries WHERE id IN ({placeholders})",
@@ -311,12 +376,7 @@ def remove_duplicate_file_entries() -> int:
                     f"Removing duplicate entry: id={entry_id}, file_hash={entry_hash}"
                 )
 
-                # First delete related records in article_tags table
-                conn.execute(
-                    "DELETE FROM article_tags WHERE article_id = ?", (entry_id,)
-                )
-
-                # Then delete the article summary entry
+                # Related article_tags rows are removed by ON DELETE CASCADE
                 conn.execute("DELETE FROM article_summaries WHERE id = ?", (entry_id,))
 
                 removed_count += 1
@@ -450,8 +510,6 @@ def sync_tags_from_config(config: Dict[str, Any]) -> None:
 
         for tag_name in set(existing_tags) - config_tag_names:
             tag_id = existing_tags[tag_name]["id"]
-            cursor.execute("DELETE FROM article_tags WHERE tag_id = ?", (tag_id,))
-            cursor.execute("DELETE FROM tag_hashes WHERE tag_id = ?", (tag_id,))
             cursor.execute("DELETE FROM tags WHERE id = ?", (tag_id,))
             logger.debug(f"Deleted tag '{tag_name}' as it no longer exists in config")
 
@@ -485,7 +543,7 @@ def get_all_article_tags() -> List[Tuple[int, str, int]]:
     Returns:
         List of tuples containing (article_id, file_name, tag_id)
     """
-    with get_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.execute(
             """
             SELECT at.article_id, a.file_name, at.tag_id 
@@ -516,12 +574,28 @@ def get_all_tag_details() -> Dict[int, Dict[str, Any]]:
 
 
 def set_article_tag(article_id: int, tag_id: int, matches: bool) -> None:
+    set_article_tags_bulk([(article_id, tag_id, matches)])
+
+
+def set_article_tags_bulk(assignments: Iterable[Tuple[int, int, bool]]) -> int:
+    """Write many (article_id, tag_id, matches) rows in a single transaction.
+
+    Returns:
+        int: Number of tag assignments written.
+    """
+    rows = [
+        (article_id, tag_id, 1 if matches else 0)
+        for article_id, tag_id, matches in assignments
+    ]
+    if not rows:
+        return 0
     with get_connection() as conn:
-        conn.execute(
+        conn.executemany(
             "INSERT OR REPLACE INTO article_tags (article_id, tag_id, matches) VALUES (?, ?, ?)",
-            (article_id, tag_id, 1 if matches else 0),
+            rows,
         )
         conn.commit()
+    return len(rows)
 
 
 def remove_orphaned_tags() -> int:
@@ -540,7 +614,7 @@ def get_articles_by_tag(tag_name: str) -> List[str]:
     tag_id = get_tag_id_by_name(tag_name)
     if not tag_id:
         return []
-    with get_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.execute(
             "SELECT a.file_name FROM article_summaries a JOIN article_tags at ON a.id = at.article_id WHERE at.tag_id = ? AND at.matches = 1",
             (tag_id,),
@@ -552,7 +626,7 @@ def get_articles_not_matching_tag(tag_name: str) -> List[str]:
     tag_id = get_tag_id_by_name(tag_name)
     if not tag_id:
         return []
-    with get_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.execute(
             "SELECT a.file_name FROM article_summaries a JOIN article_tags at ON a.id = at.article_id WHERE at.tag_id = ? AND at.matches = 0",
             (tag_id,),
@@ -599,7 +673,7 @@ def get_articles_needing_tagging(
 
 
 def get_all_tags_with_article_count() -> List[Tuple[int, str, int]]:
-    with get_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.execute(
             """
             SELECT t.id, t.name, COUNT(at.article_id) 
@@ -611,7 +685,7 @@ def get_all_tags_with_article_count() -> List[Tuple[int, str, int]]:
 
 
 def get_articles_for_tag(tag_id: int) -> List[Tuple[int, str]]:
-    with get_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.execute(
             "SELECT a.id, a.file_name FROM article_summaries a JOIN article_tags at ON a.id = at.article_id WHERE at.tag_id = ? AND at.matches = 1",
             (tag_id,),
@@ -620,13 +694,14 @@ def get_articles_for_tag(tag_id: int) -> List[Tuple[int, str]]:
 
 
 def clean_orphaned_database_items() -> Tuple[int, int]:
-    orphaned_tags = remove_orphaned_tags()
     with get_connection() as conn:
-        cursor = conn.execute(
+        orphaned_tags = conn.execute(
+            "DELETE FROM tags WHERE id NOT IN (SELECT DISTINCT tag_id FROM article_tags)"
+        ).rowcount
+        orphaned_hashes = conn.execute(
             "DELETE FROM tag_hashes WHERE tag_id NOT IN (SELECT id FROM tags)"
-        )
+        ).rowcount
         conn.commit()
-    orphaned_hashes = cursor.rowcount
     return orphaned_tags, orphaned_hashes
 
 
@@ -671,19 +746,25 @@ def searchArticlesByTags(
 
     # If no tags specified and only filtering by format, just apply read state filter and return
     if not all_tags and not any_tags and not not_any_tags:
-        matchingArticles = {
-            articlePath: utils.getUrlOfArticle(articlePath)
-            for articlePath in article_paths
-        }
+        matchingArticles = utils.getUrlsOfArticles(article_paths)
         return matchingArticles
 
-    conn = sqlite3.connect(db_path)
+    conn = get_read_connection()
     cursor = conn.cursor()
 
     try:
         # Extract filenames from paths for efficient filtering
         filenames = {os.path.basename(path): path for path in article_paths}
 
+        # Stage the candidate file names in a temp table rather than binding one
+        # "?" per name, so the statement stays small however many articles match
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        cursor.execute("CREATE TEMP TABLE search_file_names (name TEXT PRIMARY KEY)")
+        cursor.executemany(
+            "INSERT INTO search_file_names (name) VALUES (?)",
+            ((filename,) for filename in filenames),
+        )
+
         # Build SQL query for tag filtering
         query_params = []
 
@@ -691,49 +772,47 @@ def searchArticlesByTags(
         sql = """
         SELECT as1.file_name, as1.id 
         FROM article_summaries as1
-        WHERE as1.file_name IN ({})
-        """.format(
-            ",".join(["?"] * len(filenames))
-        )
-
-        query_params.extend(filenames.keys())
+        WHERE as1.file_name IN (SELECT name FROM temp.search_file_names)
+        """
 
         # Filter by all_tags (AND logic)
         if all_tags:
-            # For each required tag, join to article_tags and check for match
-            for i, tag in enumerate(all_tags):
-                tag_alias = f"at{i}"
-                tag_join = f"""
-                JOIN article_tags {tag_alias} ON as1.id = {tag_alias}.article_id
-                JOIN tags t{i} ON {tag_alias}.tag_id = t{i}.id AND t{i}.name = ? AND {tag_alias}.matches = 1
-                """
-                sql = sql.replace(
-                    "FROM article_summaries as1",
-                    f"FROM article_summaries as1 {tag_join}",
-                )
-                query_params.append(tag)
+            # One grouped subquery instead of a pair of joins per required tag:
+            # an article qualifies when it matches every distinct required tag
+            required_tags = list(dict.fromkeys(all_tags))
+            all_tags_subquery = """
+            as1.id IN (
+                SELECT at_all.article_id
+                FROM article_tags at_all
+                JOIN tags t_all ON at_all.tag_id = t_all.id
+                WHERE at_all.matches = 1
+                AND t_all.name IN ({})
+                GROUP BY at_all.article_id
+                HAVING COUNT(DISTINCT t_all.name) = ?
+            )
+            """.format(
+                ",".join(["?"] * len(required_tags))
+            )
+            query_params.extend(required_tags)
+            query_params.append(len(required_tags))
+            sql += " AND " + all_tags_subquery
 
         # Filter by any_tags (OR logic)
         if any_tags:
-            or_conditions = []
-            for tag in any_tags:
-                or_conditions.append("(t_any.name = ? AND at_any.matches = 1)")
-                query_params.append(tag)
-
-            if or_conditions:
-                any_tag_join = """
-                JOIN article_tags at_any ON as1.id = at_any.article_id
+            any_tags_subquery = """
+            EXISTS (
+                SELECT 1
+                FROM article_tags at_any
                 JOIN tags t_any ON at_any.tag_id = t_any.id
-                """
-                any_tag_where = " AND (" + " OR ".join(or_conditions) + ")"
-
-                # Add the join to the FROM clause
-                sql = sql.replace(
-                    "FROM article_summaries as1",
-                    f"FROM article_summaries as1 {any_tag_join}",
-                )
-                # Add the OR conditions to the WHERE clause
-                sql += any_tag_where
+                WHERE as1.id = at_any.article_id
+                AND at_any.matches = 1
+                AND t_any.name IN ({})
+            )
+            """.format(
+                ",".join(["?"] * len(any_tags))
+            )
+            query_params.extend(any_tags)
+            sql += " AND " + any_tags_subquery
 
         # Filter by not_any_tags (NOT ANY logic)
         if not_any_tags:
@@ -759,11 +838,11 @@ def searchArticlesByTags(
         matching_files = cursor.fetchall()
 
         # Build result dictionary
-        matchingArticles = {
-            filenames[filename]: utils.getUrlOfArticle(filenames[filename])
+        matchingArticles = utils.getUrlsOfArticles(
+            filenames[filename]
             for filename, _ in matching_files
             if filename in filenames
-        }
+        )
         return matchingArticles
 
     finally:
@@ -2,13 +2,20 @@ import os
 import webbrowser
 import ssl
 import time
-import json
+import atexit
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException, WebDriverException
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse
 import markdown
 from loguru import logger
@@ -21,62 +28,135 @@ requests.packages.urllib3.disable_warnings()
 sys.path.append(utils.getConfig()["convertLinksDir"])
 from convertLinks import main as convertLinks
 
+MAX_DOWNLOAD_WORKERS = 4  # Default, can be overridden by config
+WRITE_BUFFER_SIZE = 1 << 20
+CHROME_SPEED_FLAGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-translate",
+    "--metrics-recording-only",
+]
 
-def calcUrlsToAdd(onlyRead=False):
-    bookmarksFilePath = utils.getConfig()["bookmarksFilePath"]
-    with open(bookmarksFilePath) as f:
-        bookmarks = json.load(f)
+# WebDriver is not thread-safe, so each download worker owns its own driver
+_threadLocal = threading.local()
+_drivers = []
+_driversLock = threading.Lock()
+# Serialises choosing a unique file name and writing to it in saveDirectory
+_saveLock = threading.Lock()
 
-    urlsToAdd = {}
+# Shared keep-alive session so repeated requests reuse pooled connections
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+_SESSION.mount("https://", _adapter)
+_SESSION.mount("http://", _adapter)
 
-    if onlyRead:
-        markedAsReadUrls = utils.getUrlsFromFile(
-            utils.getAbsPath("../storage/markedAsReadArticles.txt")
-        )
 
-    allAddedUrls = utils.getUrlsFromFile(
-        utils.getAbsPath("../storage/alreadyAddedArticles.txt")
-    )
+def getBookmarkedUrls():
+    """Return {subject folder name: [formatted url, ...]} for the @Voice bookmarks."""
+    bookmarksFilePath = utils.getConfig()["bookmarksFilePath"]
+    with open(bookmarksFilePath, "rb") as f:
+        bookmarks = orjson.loads(f.read())
+
+    bookmarkedUrls = {}
     bmBar = bookmarks["roots"]["bookmark_bar"]["children"]
     for folder in bmBar:
         if folder["type"] == "folder" and folder["name"] == "@Voice":
             for folder in folder["children"]:
-                subject = folder["name"]
-                if onlyRead and subject.lower() == "unread":
-                    continue
-                urlsToAdd[subject] = []
-                for link in folder["children"]:
-                    url = link["url"]
-                    url = utils.formatUrl(url)
-                    if onlyRead:
-                        if (
-                            url.lower() not in "\n".join(markedAsReadUrls).lower()
-                            and url.lower() in "\n".join(allAddedUrls).lower()
-                        ):
-                            url = convertLinks(url, False, True)
-                            if url and url[0]:
-                                url = url[0]
-                                if (
-                                    url.lower()
-                                    not in "\n".join(markedAsReadUrls).lower()
-                                    and url.lower() in "\n".join(allAddedUrls).lower()
-                                ):
-                                    urlsToAdd[subject].append(url)
-                                    logger.info(f"added url: {url}")
-                    else:
-                        if url.lower() not in "\n".join(allAddedUrls).lower():
-                            url = convertLinks(url, False, True)
-                            if url and url[0]:
-                                url = url[0]
-                                if url.lower() not in "\n".join(allAddedUrls).lower():
-                                    urlsToAdd[subject].append(url)
-                                    logger.info(f"added url: {url}")
+                bookmarkedUrls[folder["name"]] = [
+                    utils.formatUrl(link["url"]) for link in folder["children"]
+                ]
+    return bookmarkedUrls
+
+
+def calcUrlsToAdd(onlyRead=False, bookmarkedUrls=None):
+    # Pass bookmarkedUrls from getBookmarkedUrls() to reuse one parse of the
+    # bookmarks file across calls; the url list files are always re-read
+    if bookmarkedUrls is None:
+        bookmarkedUrls = getBookmarkedUrls()
+
+    urlsToAdd = {}
+
+    markedAsReadUrls = set()
+    if onlyRead:
+        markedAsReadUrls = {
+            url.lower()
+            for url in utils.getUrlsFromFile(utils.MARKED_AS_READ_ARTICLES_FILE)
+        }
+
+    allAddedUrls = {
+        url.lower() for url in utils.getUrlsFromFile(utils.ALREADY_ADDED_ARTICLES_FILE)
+    }
+    # Pick the bookmarks worth converting first, so urls bookmarked under several
+    # subjects are converted once
+    candidatesBySubject = {}
+    for subject, urls in bookmarkedUrls.items():
+        if onlyRead and subject.lower() == "unread":
+            continue
+        if onlyRead:
+            candidatesBySubject[subject] = [
+                url
+                for url in urls
+                if url.lower() not in markedAsReadUrls and url.lower() in allAddedUrls
+            ]
+        else:
+            candidatesBySubject[subject] = [
+                url for url in urls if url.lower() not in allAddedUrls
+            ]
+
+    candidates = list(
+        dict.fromkeys(url for urls in candidatesBySubject.values() for url in urls)
+    )
+    # convertLinks is not known to be thread-safe, so urls are converted one at a
+    # time; _convertLink still resolves each distinct url only once
+    convertedUrls = {url: _convertLink(url) for url in candidates}
+
+    for subject, urls in candidatesBySubject.items():
+        urlsToAdd[subject] = []
+        for url in urls:
+            url = convertedUrls[url]
+            if url and url[0]:
+                url = url[0]
+                if onlyRead:
+                    if (
+                        url.lower() not in markedAsReadUrls
+                        and url.lower() in allAddedUrls
+                    ):
+                        urlsToAdd[subject].append(url)
+                        logger.info(f"added url: {url}")
+                else:
+                    if url.lower() not in allAddedUrls:
+                        urlsToAdd[subject].append(url)
+                        logger.info(f"added url: {url}")
 
     return urlsToAdd
 
 
+@functools.lru_cache(maxsize=4096)
+def _convertLink(url):
+    # Cached so the onlyRead pass in main() reuses the first pass's conversions
+    return convertLinks(url, False, True)
+
+
+def fetch_headers(url, timeout=10):
+    """HEAD the url, falling back to a body-less GET unless HEAD returns 200."""
+    response = _SESSION.head(url, verify=False, timeout=timeout, allow_redirects=True)
+    # Some servers answer HEAD differently from GET (e.g. 400/404), so only a
+    # 200 is trusted and any other status is rechecked with a real GET
+    if response.status_code != 200:
+        response = _SESSION.get(url, verify=False, timeout=timeout, stream=True)
+        response.close()
+    return response
+
+
 def save_text_as_html(url):
-    response = requests.get(url, verify=ssl.CERT_NONE, timeout=10)
+    response = _SESSION.get(url, verify=ssl.CERT_NONE, timeout=10)
     text_content = response.text
 
     # Convert text to HTML using markdown
@@ -92,31 +172,98 @@ def save_text_as_html(url):
 def downloadNewArticles(urlsToAdd):
     saveDirectory = utils.getConfig()["pdfSourceFolders"][0]
     logger.info(f"URLs to add: {urlsToAdd}")
-    for url in urlsToAdd:
-        urlCopy = str(url)
-        if url.endswith(".pdf"):
-            continue
+    urlsToDownload = [url for url in urlsToAdd if not url.endswith(".pdf")]
+    if not urlsToDownload:
+        return
+
+    def downloadArticle(url):
         logger.info(f"trying to download: {url}")
+        driver = None
         try:
-            save_mobile_article_as_mhtml(url, saveDirectory)
+            driver = _getThreadDriver()
+            save_mobile_article_as_mhtml(url, saveDirectory, driver=driver)
+        except WebDriverException as e:
+            logger.error(f"Error downloading article: {url} {e}")
+            # The session may be dead, so give the next url a fresh driver
+            _discardThreadDriver()
+            driver = None
         except Exception as e:
             logger.error(f"Error downloading article: {url} {e}")
+        finally:
+            if driver is not None:
+                try:
+                    driver.delete_all_cookies()
+                except WebDriverException as e:
+                    logger.warning(f"Error clearing webdriver cookies: {e}")
+                    _discardThreadDriver()
+
+    max_workers = utils.getConfig().get("maxDownloadWorkers", MAX_DOWNLOAD_WORKERS)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(downloadArticle, urlsToDownload))
+    finally:
+        _quitThreadDrivers()
+
+
+def _getThreadDriver():
+    driver = getattr(_threadLocal, "driver", None)
+    if driver is None:
+        driver = create_webdriver()
+        _threadLocal.driver = driver
+        with _driversLock:
+            _drivers.append(driver)
+    return driver
 
 
-def save_webpage_as_mhtml(url, timeout=10, min_load_time=5):
+def _discardThreadDriver():
+    driver = getattr(_threadLocal, "driver", None)
+    if driver is None:
+        return
+    _threadLocal.driver = None
+    with _driversLock:
+        if driver in _drivers:
+            _drivers.remove(driver)
     try:
-        resp = requests.get(url, verify=False, timeout=timeout)
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Failed to fetch {url}: {e}")
-    if resp.status_code != 200:
-        raise Exception(f"Failed to download {url}, status code {resp.status_code}")
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Error quitting webdriver: {e}")
+
 
+@atexit.register
+def _quitThreadDrivers():
+    with _driversLock:
+        for driver in _drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.warning(f"Error quitting webdriver: {e}")
+        _drivers.clear()
+
+
+def create_webdriver():
     chrome_options = Options()
     user_agent = "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1"
     chrome_options.add_argument(f"user-agent={user_agent}")
     chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("--headless")
-    driver = webdriver.Chrome(options=chrome_options)
+    chrome_options.add_argument("--headless=new")
+    for flag in CHROME_SPEED_FLAGS:
+        chrome_options.add_argument(flag)
+    # Return from driver.get() at DOMContentLoaded instead of the full load event
+    chrome_options.page_load_strategy = "eager"
+    return webdriver.Chrome(options=chrome_options)
+
+
+def save_webpage_as_mhtml(url, timeout=10, min_load_time=5, driver=None):
+    try:
+        resp = fetch_headers(url, timeout)
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Failed to fetch {url}: {e}")
+    if resp.status_code != 200:
+        raise Exception(f"Failed to download {url}, status code {resp.status_code}")
+
+    ownsDriver = driver is None
+    if ownsDriver:
+        driver = create_webdriver()
 
     try:
         start_time = time.time()
@@ -125,7 +272,14 @@ def save_webpage_as_mhtml(url, timeout=10, min_load_time=5):
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
         body_load_time = time.time() - start_time
         remaining_time = max(0, min_load_time - body_load_time)
-        time.sleep(remaining_time)
+        # Stop waiting as soon as the page has finished loading, rather than
+        # always sleeping out the remainder of min_load_time
+        try:
+            WebDriverWait(driver, remaining_time).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+        except TimeoutException:
+            pass
 
         title = driver.title
         title = "".join(c for c in title if c.isalnum() or c.isspace()).rstrip()
@@ -135,18 +289,21 @@ def save_webpage_as_mhtml(url, timeout=10, min_load_time=5):
         )["data"]
 
     finally:
-        driver.quit()
+        if ownsDriver:
+            driver.quit()
 
     return mhtml_data, title
 
 
-def save_mobile_article_as_mhtml(url, saveDirectory, timeout=10, min_load_time=5):
+def save_mobile_article_as_mhtml(
+    url, saveDirectory, timeout=10, min_load_time=5, driver=None
+):
     originalUrl = url
     try:
-        response = requests.get(url, verify=False, timeout=timeout)
+        response = fetch_headers(url, timeout)
     except requests.exceptions.SSLError:
         url = url.replace("https", "http")
-        response = requests.get(url, verify=False, timeout=timeout)
+        response = fetch_headers(url, timeout)
     if response.status_code != 200:
 
         webbrowser.open(url)
@@ -164,20 +321,25 @@ def save_mobile_article_as_mhtml(url, saveDirectory, timeout=10, min_load_time=5
     else:
         fileExt = ".mhtml"
         logger.debug(f"saving url: {url} as webpage")
-        htmlText, title = save_webpage_as_mhtml(url, timeout, min_load_time)
-
-    file_path = os.path.join(saveDirectory, f"{title}{fileExt}")
-    if os.path.exists(file_path):
-        currentTime = int(time.time())
-        file_path = file_path.replace(fileExt, f"_{currentTime}{fileExt}")
+        htmlText, title = save_webpage_as_mhtml(url, timeout, min_load_time, driver)
 
     if downloadAsHtml:
         htmlText = f"<!-- Hyperionics-OriginHtml {originalUrl}-->\n{htmlText}"
-        with open(file_path, "w") as file:
+
+    with _saveLock:
+        file_path = os.path.join(saveDirectory, f"{title}{fileExt}")
+        # Parallel downloads can share a title, so keep counting until the name is free
+        counter = 1
+        while os.path.exists(file_path):
+            file_path = os.path.join(saveDirectory, f"{title}_{counter}{fileExt}")
+            counter += 1
+
+        # Write the str straight through a large buffer rather than encoding a
+        # full bytes copy first; newline="" keeps MHTML's CRLF line endings intact
+        with open(
+            file_path, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER_SIZE
+        ) as file:
             file.write(htmlText)
-    else:
-        with open(file_path, "wb") as file:
-            file.write(htmlText.encode("utf-8"))
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ import sys
 import cProfile
 import pstats
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from loguru import logger
 from . import (
@@ -14,19 +15,30 @@ from . import (
     manageDocs,
 )
 
-# Configure loguru logger
-logger.remove()
-logger.add(sys.stdout, level="INFO")
-
-# Add file logging to logs/main.log with rotation
-log_file = Path("logs/main.log")
-logger.add(
-    log_file,
-    level="INFO",
-    rotation="10 MB",
-    retention="30 days",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
-)
+
+def configureLogging():
+    # Only called from __main__, so spawned worker processes that re-import
+    # this module as __mp_main__ don't add handlers or rotate the log file
+    logger.remove()
+    logger.add(sys.stdout, level="INFO")
+
+    # Add file logging to logs/main.log with rotation
+    log_file = Path("logs/main.log")
+    logger.add(
+        log_file,
+        level="INFO",
+        rotation="10 MB",
+        retention="30 days",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+    )
+
+
+def cleanDatabase():
+    logger.info("remove nonexistent files from database")
+    db.remove_duplicate_file_entries()
+    db.remove_nonexistent_files_from_database()
+    logger.info("remove orphaned tags from database")
+    db.remove_orphaned_tags_from_database()
 
 
 def main():
@@ -35,52 +47,65 @@ def main():
     logger.info(f"Starting main.py execution at {datetime.datetime.now()}")
     logger.info(f"Monitoring directory: {ebooks_folder}")
 
+    # Create the schema and run any pending migrations before the cleanup
+    # thread deletes rows with foreign key enforcement on
+    db.setup_database()
+
     # Capture initial directory state
     initial_snapshot = utils.get_directory_snapshot(ebooks_folder)
-    logger.info("remove nonexistent files from database")
-    db.remove_duplicate_file_entries()
-    db.remove_nonexistent_files_from_database()
-    logger.info("remove orphaned tags from database")
-    db.remove_orphaned_tags_from_database()
-    logger.info("calc new urls to add")
-    urlsToAdd = downloadNewArticles.calcUrlsToAdd()
-    allUrls = urlsToAdd["AlreadyRead"] + urlsToAdd["UnRead"]
-    logger.info("download new articles")
-    downloadNewArticles.downloadNewArticles(allUrls)
-    logger.info("give files readable filenames")
-    manageDocs.retitleAllPDFs()
-    logger.info("move docs to target folder")
-    manageDocs.moveDocsToTargetFolder()
-    logger.info("add files to database")
-    db.add_files_to_database()
-    logger.info("summarize articles")
-    articleSummary.summarize_articles()
-    logger.info("tag articles")
-    articleTagging.tagArticles()
-    logger.info("update urlList files")
-    articleTagging.updatePerTagFiles(utils.getConfig()["articleFileFolder"])
-    logger.info("act on requests to delete/hide articles from atVoice app\n\n")
-    logger.info("delete files marked to delete")
-    manageDocs.deleteFilesMarkedToDelete()
-    logger.info("hide articles marked as read")
-    manageDocs.hideArticlesMarkedAsRead()
-    logger.info("mark read bookmarks as read")
-    manageDocs.markArticlesWithUrlsAsRead(
-        downloadNewArticles.calcUrlsToAdd(onlyRead=True)["AlreadyRead"],
-    )
-    logger.info("add file hashes to already added files")
-    manageDocs.addFilesToAlreadyAddedList()
-    logger.info("add read file hashes to marked as read files")
-    manageDocs.addReadFilesToMarkedAsReadList()
-    logger.info("delete duplicate files")
-    manageDocs.deleteDocsWithSameHash()
-    manageDocs.deleteDocsWithSameUrl()
-    logger.info("update alreadyAddedArticles.txt")
-    articleUrls = [url for url in utils.getArticleUrls().values()]
-    utils.addUrlsToUrlFile(
-        articleUrls,
-        utils.getAbsPath("../storage/alreadyAddedArticles.txt"),
-    )
+    # Database cleanup, bookmark diffing/downloading and PDF retitling touch
+    # disjoint state, so overlap them and join before moving docs into the library
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        databaseCleanup = executor.submit(cleanDatabase)
+        logger.info("give files readable filenames")
+        pdfRetitling = executor.submit(manageDocs.retitleAllPDFs)
+        logger.info("calc new urls to add")
+        bookmarkedUrls = downloadNewArticles.getBookmarkedUrls()
+        urlsToAdd = downloadNewArticles.calcUrlsToAdd(bookmarkedUrls=bookmarkedUrls)
+        allUrls = urlsToAdd["AlreadyRead"] + urlsToAdd["UnRead"]
+        logger.info("download new articles")
+        downloadNewArticles.downloadNewArticles(allUrls)
+        pdfRetitling.result()
+        databaseCleanup.result()
+    # Buffer url list writes for the rest of the pass and append them once at the end
+    with (
+        utils.UrlFileBatch(utils.ALREADY_ADDED_ARTICLES_FILE),
+        utils.UrlFileBatch(utils.MARKED_AS_READ_ARTICLES_FILE),
+    ):
+        logger.info("move docs to target folder")
+        manageDocs.moveDocsToTargetFolder()
+        logger.info("add files to database")
+        db.add_files_to_database()
+        logger.info("summarize articles")
+        articleSummary.summarize_articles()
+        logger.info("tag articles")
+        articleTagging.tagArticles()
+        logger.info("update urlList files")
+        articleTagging.updatePerTagFiles(utils.getConfig()["articleFileFolder"])
+        logger.info("act on requests to delete/hide articles from atVoice app\n\n")
+        logger.info("delete files marked to delete")
+        manageDocs.deleteFilesMarkedToDelete()
+        logger.info("hide articles marked as read")
+        manageDocs.hideArticlesMarkedAsRead()
+        logger.info("mark read bookmarks as read")
+        manageDocs.markArticlesWithUrlsAsRead(
+            downloadNewArticles.calcUrlsToAdd(
+                onlyRead=True, bookmarkedUrls=bookmarkedUrls
+            )["AlreadyRead"],
+        )
+        logger.info("add file hashes to already added files")
+        manageDocs.addFilesToAlreadyAddedList()
+        logger.info("add read file hashes to marked as read files")
+        manageDocs.addReadFilesToMarkedAsReadList()
+        logger.info("delete duplicate files")
+        manageDocs.deleteDocsWithSameHash()
+        manageDocs.deleteDocsWithSameUrl()
+        logger.info("update alreadyAddedArticles.txt")
+        articleUrls = [url for url in utils.getArticleUrls().values()]
+        utils.addUrlsToUrlFile(
+            articleUrls,
+            utils.ALREADY_ADDED_ARTICLES_FILE,
+        )
     logger.info("update @voice lists")
     generateLists.appendToLists()
     # generateLists.modifyListFiles()
@@ -93,6 +118,7 @@ def main():
 
 
 if __name__ == "__main__":
+    configureLogging()
     # profiler = cProfile.Profile()
     # profiler.enable()
 
@@ -1,15 +1,41 @@
 import os
 import random
 import shutil
+import multiprocessing
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pdftitle
 from loguru import logger
 from . import utils, manageLists
 import pysnooper
 
+# Hashing is dominated by disk reads, so overlap them across a few threads
+MAX_HASH_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+# Each spawned worker re-imports the package, so keep the pool small
+MAX_PDF_TITLE_WORKERS = min(4, os.cpu_count() or 1)
 
-def delete_file_with_name(file_name):
+
+def hashFiles(filePaths):
+    """Return {path: calculate_normal_hash(path)}, reading files concurrently."""
+    if not filePaths:
+        return {}
+    with ThreadPoolExecutor(max_workers=MAX_HASH_WORKERS) as executor:
+        return dict(
+            zip(filePaths, executor.map(utils.calculate_normal_hash, filePaths))
+        )
+
+
+def _folder_file_index(folder):
+    """Names of the files directly inside folder, read with a single scandir."""
+    with os.scandir(folder) as entries:
+        return {entry.name for entry in entries if entry.is_file()}
+
+
+def delete_file_with_name(file_name, index=None):
     # Find all files with the file name in the folder using our enhanced function
     # Delete all found files
+    # index is an optional _folder_file_index of the folder, kept up to date here,
+    # so batch callers avoid an exists() probe per candidate extension
     folder = utils.getConfig()["articleFileFolder"]
     notFound = True
     possibleExts = ["pdf", "epub"]
@@ -26,10 +52,16 @@ def delete_file_with_name(file_name):
             dest = os.path.join(
                 homeDir, ".local/share/Trash/files/", "DEL_FILE_W_NAME" + fileName
             )
-            while os.path.exists(dest):
-                dest = dest + "_" + str(random.randint(0, 10000))
-            if os.path.exists(matching_file):
+            if (
+                fileName in index
+                if index is not None
+                else os.path.exists(matching_file)
+            ):
+                while os.path.exists(dest):
+                    dest = dest + "_" + str(random.randint(0, 10000))
                 shutil.move(matching_file, dest)
+                if index is not None:
+                    index.discard(fileName)
                 logger.info(f"Deleted {matching_file}")
                 notFound = False
         except OSError:
@@ -40,7 +72,8 @@ def delete_file_with_name(file_name):
         )
 
 
-def hide_file_with_name(orgFileName):
+def hide_file_with_name(orgFileName, index=None):
+    # index is an optional _folder_file_index of the folder, kept up to date here
     folder = utils.getConfig()["articleFileFolder"]
     possibleExts = ["pdf", "epub"]
     currentExt = os.path.splitext(orgFileName)[1].lstrip(
@@ -53,13 +86,20 @@ def hide_file_with_name(orgFileName):
         try:
             fileName = os.path.splitext(orgFileName)[0] + "." + ext
             matching_file = os.path.join(folder, fileName)
-            if os.path.exists(matching_file):
+            if (
+                fileName in index
+                if index is not None
+                else os.path.exists(matching_file)
+            ):
                 hiddenFileName = "." + fileName
                 if hiddenFileName == "." or fileName[0] == ".":
                     continue
                 hiddenFilePath = os.path.join(folder, hiddenFileName)
                 logger.info(f"HIDING {fileName} >> {hiddenFilePath}")
                 shutil.move(matching_file, hiddenFilePath)
+                if index is not None:
+                    index.discard(fileName)
+                    index.add(hiddenFileName)
                 notFound = False
                 return hiddenFilePath
         except OSError:
@@ -77,19 +117,17 @@ def addFilesToAlreadyAddedList():
         for fmt in utils.getConfig()["docFormatsToMove"]
         if fmt not in ["html", "mhtml"]
     ]
-    listFile = utils.getAbsPath("../storage/alreadyAddedArticles.txt")
+    listFile = utils.ALREADY_ADDED_ARTICLES_FILE
     matchingArticles = utils.getArticlePaths(formats=nonHtmlFormats)
-    alreadyAddedFileNames = str(utils.getUrlsFromFile(listFile)).lower()
-    fileNames = [
-        os.path.basename(filePath)
-        for filePath in matchingArticles
-        if os.path.basename(filePath).lower() not in alreadyAddedFileNames
-    ]
-    fileHashes = [
-        utils.calculate_normal_hash(filePath)
-        for filePath in matchingArticles
-        if os.path.basename(filePath).lower() not in alreadyAddedFileNames
-    ]
+    alreadyAddedFileNames = {item.lower() for item in utils.getUrlsFromFile(listFile)}
+    fileNames = []
+    fileHashes = []
+    for filePath in matchingArticles:
+        fileName = os.path.basename(filePath)
+        if fileName.lower() in alreadyAddedFileNames:
+            continue
+        fileNames.append(fileName)
+        fileHashes.append(utils.calculate_normal_hash(filePath))
     itemsToAdd = list(set(fileNames + fileHashes))
     utils.addUrlsToUrlFile(itemsToAdd, listFile)
 
@@ -100,46 +138,53 @@ def addReadFilesToMarkedAsReadList():
         for fmt in utils.getConfig()["docFormatsToMove"]
         if fmt not in ["html", "mhtml"]
     ]
-    listFile = utils.getAbsPath("../storage/markedAsReadArticles.txt")
+    listFile = utils.MARKED_AS_READ_ARTICLES_FILE
     matchingArticles = utils.getArticlePaths(formats=nonHtmlFormats, readState="read")
-    alreadyMarkedAsReadFileNames = str(utils.getUrlsFromFile(listFile)).lower()
-    fileNames = [
-        os.path.basename(filePath)
-        for filePath in matchingArticles
-        if os.path.basename(filePath).lower() not in alreadyMarkedAsReadFileNames
-    ]
-    fileHashes = [
-        utils.calculate_normal_hash(filePath)
-        for filePath in matchingArticles
-        if os.path.basename(filePath).lower() not in alreadyMarkedAsReadFileNames
-    ]
+    alreadyMarkedAsReadFileNames = {
+        item.lower() for item in utils.getUrlsFromFile(listFile)
+    }
+    fileNames = []
+    fileHashes = []
+    for filePath in matchingArticles:
+        fileName = os.path.basename(filePath)
+        if fileName.lower() in alreadyMarkedAsReadFileNames:
+            continue
+        fileNames.append(fileName)
+        fileHashes.append(utils.calculate_normal_hash(filePath))
     itemsToAdd = list(set(fileNames + fileHashes))
     utils.addUrlsToUrlFile(itemsToAdd, listFile)
 
 
 def deleteFilesMarkedToDelete():
     markedAsDeletedFiles = manageLists.getArticlesFromList("_DELETE")
+    index = (
+        _folder_file_index(utils.getConfig()["articleFileFolder"])
+        if markedAsDeletedFiles
+        else None
+    )
     for fileName in markedAsDeletedFiles:
-        delete_file_with_name(fileName)
+        delete_file_with_name(fileName, index)
     manageLists.deleteAllArticlesInList("_DELETE")
 
 
 def hideArticlesMarkedAsRead():
     markedAsReadFiles = manageLists.getArticlesFromList("_READ")
+    articleFileFolder = utils.getConfig()["articleFileFolder"]
+    index = _folder_file_index(articleFileFolder) if markedAsReadFiles else None
+    readUrls = []
     for fileName in markedAsReadFiles:
         try:
-            utils.addUrlsToUrlFile(
-                utils.getUrlOfArticle(
-                    os.path.join(utils.getConfig()["articleFileFolder"], fileName)
-                ),
-                utils.getAbsPath("../storage/markedAsReadArticles.txt"),
+            readUrls.append(
+                utils.getUrlOfArticle(os.path.join(articleFileFolder, fileName))
             )
         except Exception as e:
             logger.error(f"Failed to mark {fileName} as read: {e}")
         try:
-            hide_file_with_name(fileName)
+            hide_file_with_name(fileName, index)
         except Exception as e:
             logger.error(f"Failed to hide {fileName}: {e}")
+    if readUrls:
+        utils.addUrlsToUrlFile(readUrls, utils.MARKED_AS_READ_ARTICLES_FILE)
     manageLists.deleteAllArticlesInList("_READ")
 
 
@@ -223,15 +268,17 @@ def moveDocsToTargetFolder():
 
     logger.info(f"Number of docPaths: {len(docPaths)}")
 
-    alreadyAddedHashes = str(
-        utils.getUrlsFromFile(utils.getAbsPath("../storage/alreadyAddedArticles.txt"))
-    ).lower()
+    alreadyAddedHashes = {
+        item.lower()
+        for item in utils.getUrlsFromFile(utils.ALREADY_ADDED_ARTICLES_FILE)
+    }
 
+    docHashes = hashFiles(docPaths)
     for docPath in docPaths:
-        docHash = utils.calculate_normal_hash(docPath)
+        docHash = docHashes[docPath]
         docHashIsInAlreadyAdded = docHash.lower() in alreadyAddedHashes
         docUrl = utils.formatUrl(utils.getUrlOfArticle(docPath))
-        docUrlIsInAlreadyAdded = docUrl.lower() in alreadyAddedHashes
+        docUrlIsInAlreadyAdded = bool(docUrl) and docUrl.lower() in alreadyAddedHashes
 
         if docHashIsInAlreadyAdded or docUrlIsInAlreadyAdded:
             logger.warning(
@@ -265,27 +312,38 @@ def moveDocsToTargetFolder():
 
         utils.addUrlsToUrlFile(
             [docHash, docUrl, os.path.basename(targetPath)],
-            utils.getAbsPath("../storage/alreadyAddedArticles.txt"),
+            utils.ALREADY_ADDED_ARTICLES_FILE,
         )
 
 
 def deleteDocsWithSameUrl():
     directory_path = utils.getConfig()["articleFileFolder"]
+    files_by_size = defaultdict(list)
     duplicate_size_files = defaultdict(list)
 
-    for filename in os.listdir(directory_path):
-        full_path = os.path.join(directory_path, filename)
-
-        # Skip if not a file
-        if not os.path.isfile(full_path):
-            continue
-
-        file_size = os.path.getsize(full_path)
-        file_hash = utils.calculate_normal_hash(full_path)
+    # scandir entries carry cached type/stat info, saving a stat per check
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            # Skip if not a file
+            if not entry.is_file():
+                continue
 
-        unique_key = f"{file_size}_{file_hash}"
+            files_by_size[entry.stat().st_size].append(entry.path)
 
-        duplicate_size_files[unique_key].append(full_path)
+    # Files can only be duplicates if their sizes match, so only hash those
+    candidate_paths = [
+        full_path
+        for file_paths in files_by_size.values()
+        if len(file_paths) > 1
+        for full_path in file_paths
+    ]
+    file_hashes = hashFiles(candidate_paths)
+    for file_size, file_paths in files_by_size.items():
+        if len(file_paths) < 2:
+            continue
+        for full_path in file_paths:
+            unique_key = f"{file_size}_{file_hashes[full_path]}"
+            duplicate_size_files[unique_key].append(full_path)
 
     for unique_key, file_paths in duplicate_size_files.items():
         if len(file_paths) > 1:
@@ -333,25 +391,32 @@ def deleteDocsWithSameUrl():
 
 
 def markArticlesWithUrlsAsRead(readUrls):
+    if not readUrls:
+        return
     articleUrls = utils.getArticleUrls()
-    articleUrls = {v: k for k, v in articleUrls.items()}
+    articlePathsByUrl = {url: path for path, url in articleUrls.items()}
     for url in readUrls:
-        if url in articleUrls:
+        articlePath = articlePathsByUrl.get(url)
+        if articlePath:
             try:
-                hide_file_with_name(os.path.basename(articleUrls[url]))
+                hide_file_with_name(os.path.basename(articlePath))
             except OSError:
-                logger.error(f"Error hiding {articleUrls[url]}")
-        utils.addUrlsToUrlFile(
-            url, utils.getAbsPath("../storage/markedAsReadArticles.txt")
-        )
+                logger.error(f"Error hiding {articlePath}")
+    utils.addUrlsToUrlFile(list(readUrls), utils.MARKED_AS_READ_ARTICLES_FILE)
 
 
-def getPDFTitle(pdfPath):
-    pdfTitle = ""
+def extractPDFTitle(pdfPath):
+    try:
+        return pdftitle.get_title_from_file(pdfPath, pdftitle.GetTitleParameters())
+    except Exception as e:
+        logger.warning(f"pdftitle failed for {pdfPath}: {e}")
+        return ""
+
+
+def formatPDFTitle(pdfPath, pdfTitle):
     originalFileName = os.path.basename(pdfPath)
-    pdfTitle = os.popen('pdftitle -p "' + pdfPath + '"').read()
     if (not pdfTitle) or len(pdfTitle) < 4:
-        pdfTitle = originalFileName[:-4]
+        pdfTitle = os.path.splitext(originalFileName)[0]
         idType = utils.get_id_type(pdfTitle)
         if idType == "arxiv":
             pdfTitle = utils.getArxivTitle(pdfTitle)
@@ -368,8 +433,13 @@ def getPDFTitle(pdfPath):
     return pdfTitle
 
 
-def reTitlePDF(pdfPath):
-    pdfTitle = getPDFTitle(pdfPath)
+def getPDFTitle(pdfPath):
+    return formatPDFTitle(pdfPath, extractPDFTitle(pdfPath))
+
+
+def reTitlePDF(pdfPath, pdfTitle=None):
+    if pdfTitle is None:
+        pdfTitle = getPDFTitle(pdfPath)
     newPath = os.path.join(os.path.dirname(pdfPath), pdfTitle)
     logger.info(f"Renaming PDF: {pdfPath} -> {newPath}")
     return newPath
@@ -377,15 +447,30 @@ def reTitlePDF(pdfPath):
 
 def retitlePDFsInFolder(folderPath):
     pdfPaths = utils.getArticlePaths(["pdf"], folderPath)
-    newPdfPaths = []
-    for pdfPath in pdfPaths:
-        newPath = reTitlePDF(pdfPath).lstrip(".")
+    if not pdfPaths:
+        return
+    # Title extraction parses each PDF in pure Python, so spread it over processes.
+    # Spawn rather than fork, as main() calls this while other threads are running
+    with ProcessPoolExecutor(
+        max_workers=min(MAX_PDF_TITLE_WORKERS, len(pdfPaths)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        extractedTitles = list(executor.map(extractPDFTitle, pdfPaths))
+    # The arXiv/DOI fallbacks write to the shared title caches, so they run here
+    # rather than in the workers, where each process would flush its own copy
+    retitledPaths = [
+        reTitlePDF(pdfPath, formatPDFTitle(pdfPath, pdfTitle))
+        for pdfPath, pdfTitle in zip(pdfPaths, extractedTitles)
+    ]
+    newPdfPaths = set()
+    for pdfPath, newPath in zip(pdfPaths, retitledPaths):
+        newPath = newPath.lstrip(".")
         suffix = 1
         base, ext = os.path.splitext(newPath)
         while newPath in newPdfPaths or os.path.exists(newPath):
             newPath = f"{base}_{suffix}{ext}"
             suffix += 1
-        newPdfPaths.append(newPath)
+        newPdfPaths.add(newPath)
         os.rename(pdfPath, newPath)
 
 
@@ -1,8 +1,33 @@
 import os
-import glob
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from . import utils
 from loguru import logger
 
+CONFLICT_READ_WORKERS = 4
+# @Voice list marker shown before an article's name, by file extension
+EXT_INDICATORS = {
+    "pdf": "!",
+    "epub": "#",
+    "mobi": "#",
+    "mhtml": "*",
+    "html": "*",
+}
+
+
+# Parsed (header, articles) per list path, keyed by the file's (mtime_ns, size)
+# so a list the @Voice app or Syncthing has since modified is re-read
+_parsedListCache = {}
+
+
+def writeListFile(listPath, text):
+    # Write to a sibling temp file and rename over the list, so a crash mid-write
+    # never leaves a truncated list behind
+    tmpPath = listPath + ".tmp"
+    with open(tmpPath, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmpPath, listPath)
+
 
 def getArticlesFromList(listName):
     """
@@ -26,97 +51,169 @@ def getArticlesFromList(listName):
     # ------------------------------------------------------------------
     # Resolve paths and bail out early if the list file is missing
     # ------------------------------------------------------------------
-    config_path = utils.getConfig()["atVoiceFolderPath"]
+    config = utils.getConfig()
+    config_path = config["atVoiceFolderPath"]
     listPath = os.path.join(config_path, ".config", listName + ".rlst")
-    rootPath = utils.getConfig()["droidEbooksFolderPath"]
+    rootPath = config["droidEbooksFolderPath"]
+    articleFileFolder = config["articleFileFolder"]
 
     if not os.path.exists(listPath):
         return []
 
+    root_prefix = rootPath.rstrip(os.sep) + os.sep
+
     # ------------------------------------------------------------------
-    # Helper: parse header + article lines from a .rlst text blob
+    # Helper: parse header + article lines from .rlst lines
     # ------------------------------------------------------------------
-    def parse_article_lines(text):
+    def parse_article_lines(lines):
         """
-        Returns (header_text | None, [article_relative_path, …])
+        Returns (header_text | None, [article_relative_path, …], seen_paths)
+
+        `lines` is any iterable of lines (e.g. an open file) and is consumed in
+        a single pass. `seen_paths` is the set of the returned paths, for O(1)
+        membership tests.
 
         `article_relative_path` is the path *relative to* droidEbooksFolderPath.
         """
-        text = text.strip()
-        if not text:
-            return None, []
+        lines = (line.rstrip("\n") for line in lines)
 
-        lines = text.split("\n")
+        # Leading blank lines and whitespace are not part of the list
+        first_line = next((line.lstrip() for line in lines if line.strip()), None)
+        if first_line is None:
+            return None, [], set()
 
         # Detect a header — the file has one when the second line starts with ":"
-        if len(lines) > 1 and lines[1].startswith(":"):
-            # Everything up to the *last* "\n:" belongs to the header
-            parts = text.split("\n:")
-            header_text = "\n:".join(parts[:-1]).rstrip("\n")
-            tail = parts[-1].split("\n")
-            article_lines = tail[1:]  # skip the ":" marker
+        # Everything up to the *last* line starting with ":" belongs to the header,
+        # so lines after each ":" marker stay pending until the next marker
+        second_line = next(lines, None)
+        if second_line is not None and second_line.startswith(":"):
+            header_lines = [first_line]
+            marker_line = second_line
+            article_lines = []
+            for line in lines:
+                if line.startswith(":"):
+                    header_lines.append(marker_line)
+                    header_lines.extend(article_lines)
+                    marker_line = line
+                    article_lines = []
+                else:
+                    article_lines.append(line)
+            header_text = "\n".join(header_lines).rstrip("\n")
         else:
             header_text = None
-            article_lines = lines
+            article_lines = itertools.chain(
+                [first_line] if second_line is None else [first_line, second_line],
+                lines,
+            )
 
         articles = []
+        seen = set()
         for line in article_lines:
             line = line.strip()
             if not line:
                 continue
-            first_field = line.split("\t")[0]
+            first_field = line.partition("\t")[0]
             if first_field:
-                rel_to_root = os.path.relpath(first_field, rootPath)
-                if rel_to_root not in articles:
+                # .rlst paths are normally absolute under rootPath, so a prefix
+                # strip avoids relpath's normalisation; relpath handles the rest
+                if first_field.startswith(root_prefix):
+                    rel_to_root = first_field[len(root_prefix) :]
+                else:
+                    rel_to_root = os.path.relpath(first_field, rootPath)
+                if rel_to_root not in seen:
+                    seen.add(rel_to_root)
                     articles.append(rel_to_root)
 
-        return header_text, articles
+        return header_text, articles, seen
 
     # ------------------------------------------------------------------
     # 1. Read and parse the main file
     # ------------------------------------------------------------------
-    with open(listPath, "r", encoding="utf-8") as f:
-        mainText = f.read()
-
-    mainHeader, mainArticles = parse_article_lines(mainText)
+    # Reuse the previous parse while the file is unchanged on disk; hand out
+    # copies because the merge below appends to them
+    stat = os.stat(listPath)
+    cacheKey = (stat.st_mtime_ns, stat.st_size)
+    cached = _parsedListCache.get(listPath)
+    if cached is not None and cached[0] == cacheKey:
+        _, mainHeader, cachedArticles = cached
+    else:
+        with open(listPath, "r", encoding="utf-8") as f:
+            mainHeader, cachedArticles, _ = parse_article_lines(f)
+        _parsedListCache[listPath] = (cacheKey, mainHeader, cachedArticles)
+    mainArticles = list(cachedArticles)
+    mainArticleSet = set(cachedArticles)
 
     # ------------------------------------------------------------------
     # 2. Gather possible Syncthing conflict files (only for "_" lists)
     # ------------------------------------------------------------------
     conflict_files = []
-    # if listName.startswith("_"):
-    baseName = os.path.basename(listPath)
-    name_only = os.path.splitext(baseName)[0]
-    extension = os.path.splitext(baseName)[1]
-    dirName = os.path.dirname(listPath)
-    pattern = f"{name_only}.sync-conflict-*{extension}"
-    conflict_files = glob.glob(os.path.join(dirName, pattern))
+    if listName.startswith("_"):
+        baseName = os.path.basename(listPath)
+        name_only = os.path.splitext(baseName)[0]
+        extension = os.path.splitext(baseName)[1]
+        dirName = os.path.dirname(listPath)
+        # Equivalent to glob "{name_only}.sync-conflict-*{extension}" in one scandir
+        conflictPrefix = f"{name_only}.sync-conflict-"
+        with os.scandir(dirName) as entries:
+            conflict_files = [
+                entry.path
+                for entry in entries
+                if entry.name.startswith(conflictPrefix)
+                and entry.name.endswith(extension)
+            ]
 
     # ------------------------------------------------------------------
     # 3. Merge conflict articles, rewrite, and delete conflicts
     # ------------------------------------------------------------------
-    articleFileFolder = utils.getConfig()["articleFileFolder"]
     if conflict_files:
         logger.info(f"Found {len(conflict_files)} conflict files for {listName}")
-        for cfile in conflict_files:
+
+        def read_conflict_file(cfile):
             try:
                 with open(cfile, "r", encoding="utf-8") as cf:
-                    _, conflictArticles = parse_article_lines(cf.read())
+                    return cf.read(), None
+            except Exception as e:
+                return None, e
+
+        with ThreadPoolExecutor(max_workers=CONFLICT_READ_WORKERS) as executor:
+            conflictTexts = list(executor.map(read_conflict_file, conflict_files))
+
+        # Library files live directly in articleFileFolder, so one scandir lets
+        # the merge test existence in memory instead of a stat per article
+        with os.scandir(articleFileFolder) as entries:
+            presentArticles = {entry.name for entry in entries}
+
+        def article_exists(art):
+            if os.sep not in art:
+                return art in presentArticles
+            return os.path.exists(os.path.join(articleFileFolder, art))
+
+        mergedNewArticles = False
+        for cfile, (conflictText, readError) in zip(conflict_files, conflictTexts):
+            try:
+                if readError is not None:
+                    raise readError
+                _, conflictArticles, _ = parse_article_lines(conflictText.split("\n"))
                 for art in conflictArticles:
-                    if art not in mainArticles:
-                        if os.path.exists(os.path.join(articleFileFolder, art)):
+                    if art not in mainArticleSet:
+                        if article_exists(art):
+                            mainArticleSet.add(art)
                             mainArticles.append(art)
+                            mergedNewArticles = True
             except Exception as e:
                 logger.error(f"Error reading conflict file {cfile}: {e}")
 
-        # rewrite the merged list (header preserved if present)
-        if mainHeader is not None:
-            merged_text = f"{mainHeader}\n:\n" + "\n".join(mainArticles)
-        else:
-            merged_text = "\n".join(os.path.join(rootPath, art) for art in mainArticles)
         try:
-            with open(listPath, "w", encoding="utf-8") as f:
-                f.write(merged_text)
+            # rewrite the merged list (header preserved if present), unless the
+            # conflicts added nothing and the list on disk is already complete
+            if mergedNewArticles:
+                if mainHeader is not None:
+                    merged_text = f"{mainHeader}\n:\n" + "\n".join(mainArticles)
+                else:
+                    merged_text = "\n".join(
+                        os.path.join(rootPath, art) for art in mainArticles
+                    )
+                writeListFile(listPath, merged_text)
             for cfile in conflict_files:
                 try:
                     os.remove(cfile)
@@ -132,9 +229,10 @@ def getArticlesFromList(listName):
 
 
 def createListIfNotExists(listPath):
-    exists = os.path.exists(listPath)
-    if not exists:
-        open(listPath, "a").close()
+    # O_CREAT without O_TRUNC creates the file if missing and leaves it untouched
+    # otherwise, so no separate exists() check is needed
+    fd = os.open(listPath, os.O_CREAT | os.O_WRONLY | os.O_APPEND, 0o644)
+    os.close(fd)
     return True
 
 
@@ -148,36 +246,33 @@ def deleteListIfExists(listName):
 
 
 def addArticlesToList(listName, articlePathsForList):
-    listPath = os.path.join(
-        utils.getConfig()["atVoiceFolderPath"], ".config", listName + ".rlst"
-    )
+    config = utils.getConfig()
+    listPath = os.path.join(config["atVoiceFolderPath"], ".config", listName + ".rlst")
     createListIfNotExists(listPath)
-    articleNamesInList = [
+    articleNamesInList = {
         os.path.basename(line) for line in getArticlesFromList(listName)
-    ]
-    droidEbooksFolderPath = utils.getConfig()["droidEbooksFolderPath"]
-    articleFileFolder = utils.getConfig()["articleFileFolder"]
+    }
+    droidEbooksFolderPath = config["droidEbooksFolderPath"]
+    articleFileFolder = config["articleFileFolder"]
+    articlePrefix = articleFileFolder.rstrip(os.sep) + os.sep
     linesToAppend = []
     for articlePath in articlePathsForList:
         articleName = os.path.basename(articlePath)
-        relativeArticlePath = os.path.relpath(articlePath, articleFileFolder)
+        if articlePath.startswith(articlePrefix):
+            relativeArticlePath = articlePath[len(articlePrefix) :]
+        else:
+            relativeArticlePath = os.path.relpath(articlePath, articleFileFolder)
         droidArticlePath = os.path.join(droidEbooksFolderPath, relativeArticlePath)
         if articleName not in articleNamesInList:
-            extension = os.path.splitext(articleName)[1].lstrip(
-                "."
-            )  # Remove leading dot using lstrip
-            extIndicator = {
-                "pdf": "!",
-                "epub": "#",
-                "mobi": "#",
-                "mhtml": "*",
-                "html": "*",
-            }.get(extension, "")
-            displayName = os.path.splitext(articleName)[0]
+            displayName, extension = os.path.splitext(articleName)
+            extension = extension.lstrip(".")  # Remove leading dot using lstrip
+            extIndicator = EXT_INDICATORS.get(extension, "")
             linesToAppend.append(
                 droidArticlePath + "\t" + extIndicator + " " + displayName
             )
-    newListText = "\n".join(linesToAppend) + "\n" if linesToAppend else ""
+    # The list is only rewritten when there is something new to add
+    if not linesToAppend:
+        return
 
     # Read the current list content safely
     currentListText = ""
@@ -189,37 +284,37 @@ def addArticlesToList(listName, articlePathsForList):
 
     # Handle list format safely, checking for sufficient lines and format
     if currentListText:
-        lines = currentListText.split("\n")
-        # Check if we have at least 2 lines and the second line starts with ":"
-        if len(lines) > 1 and lines[1].startswith(":"):
-            existingArticleListText = "\n".join(
-                currentListText.split("\n:")[-1].split("\n")[1:]
-            )
-            headers = (
-                currentListText.replace(existingArticleListText, "").strip() + "\n"
-            )
+        # Check if we have at least 2 lines and the second line starts with ":",
+        # without splitting the whole list into lines
+        firstLineEnd = currentListText.find("\n")
+        if firstLineEnd != -1 and currentListText.startswith(":", firstLineEnd + 1):
+            # The header runs up to the end of the last line starting with ":"
+            headerMarkerIndex = currentListText.rfind("\n:")
+            endOfHeader = currentListText.find("\n", headerMarkerIndex + 1)
+            if endOfHeader == -1:
+                endOfHeader = len(currentListText)
+            existingArticleListText = currentListText[endOfHeader + 1 :]
+            headers = currentListText[:endOfHeader].rstrip() + "\n"
         else:
             # Simple format with no headers
             existingArticleListText = currentListText
 
-    articleList = newListText + existingArticleListText
     # remove duplicates from existingArticleListText, deleting articles at the top of the list first and while preserving the order
     deDupedArticleListText = []
     seen = set()
-    for line in articleList.split("\n"):
-        fileName = os.path.basename(line.split("\t")[0]).lower()
+    for line in itertools.chain(linesToAppend, existingArticleListText.split("\n")):
+        # Same as os.path.basename of the first field, without the extra split
+        fileName = line.partition("\t")[0].rpartition(os.sep)[2].lower()
         if fileName not in seen:
             seen.add(fileName)
             deDupedArticleListText.append(line)
     articleList = "\n".join(deDupedArticleListText)
 
     combinedListText = headers + articleList
-    if len(linesToAppend) > 0:
-        logger.info(f"Adding the following articles to list: {listName}\n{newListText}")
+    newListText = "\n".join(linesToAppend) + "\n"
+    logger.info(f"Adding the following articles to list: {listName}\n{newListText}")
 
-    if len(linesToAppend) > 0:
-        with open(listPath, "w") as f:
-            f.write(combinedListText)
+    writeListFile(listPath, combinedListText)
 
 
 def deleteAllArticlesInList(listName):
@@ -227,7 +322,8 @@ def deleteAllArticlesInList(listName):
         utils.getConfig()["atVoiceFolderPath"], ".config", listName + ".rlst"
     )
     createListIfNotExists(listPath)
-    currentListText = open(listPath).read().strip()
+    with open(listPath, "r") as f:
+        currentListText = f.read().strip()
 
     textWithArticlesRemoved = ""
     if "\n:m" not in currentListText:
@@ -241,5 +337,4 @@ def deleteAllArticlesInList(listName):
             + "\n"
         )  # i.e. currentListText.split("\n:m")[-1].split("\n")[0] refers to the last line in the doc which starts with :m
 
-    with open(listPath, "w") as f:
-        f.write(textWithArticlesRemoved)
+    writeListFile(listPath, textWithArticlesRemoved)
@@ -1,62 +1,168 @@
 import re
 import hashlib
+import mmap
+import functools
+import atexit
+import threading
+import time
+import tempfile
 from io import BytesIO
-from ipfs_cid import cid_sha256_hash_chunked
+from ipfs_cid import cid_sha256_hash, cid_sha256_hash_chunked
 from typing import Iterable
-import glob
 import urlexpander
-import json
+import orjson
+import xml.etree.ElementTree as ET
 import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from loguru import logger
 import requests
+from requests.adapters import HTTPAdapter
 
 # import snscrape.modules.twitter as sntwitter
 # import snscrape
 
 
-def checkArticleSubject(articlePath, subjects):
-    if not subjects:
-        return True
-    # articlePath = "/".join(articlePath.split("/")[:-1]) commented out because sometimes I want to filter by the filename e.g. to find yt videos
-    for subject in subjects:
-        if subject.lower() in articlePath.lower():
-            return True
-    return False
+@functools.lru_cache(maxsize=256)
+def _getSubstringPattern(substrings):
+    # One alternation of the escaped substrings scans a string once in C, rather
+    # than a Python-level `in` test per substring
+    return re.compile("|".join(map(re.escape, substrings)))
+
+
+class _JsonCache:
+    """A JSON file cache loaded once and written back in batches."""
+
+    FLUSH_EVERY = 64
+    # Pending writes are also flushed once they are this many seconds old
+    FLUSH_INTERVAL = 5.0
+
+    def __init__(self, path):
+        self.path = path
+        self.data = None
+        self.dirty = 0
+        self.lastFlush = time.monotonic()
+        # formatUrl and the title lookups reach the cache from worker threads
+        self.lock = threading.Lock()
+
+    def _load(self):
+        # Load existing cache or initialize an empty cache if the file does not exist
+        if self.data is None:
+            data = {}
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    data = orjson.loads(f.read())
+            self.data = data
+        return self.data
+
+    def get(self, key):
+        with self.lock:
+            return self._load().get(key)
+
+    def set(self, key, value):
+        with self.lock:
+            self._load()[key] = value
+            self.dirty += 1
+            if (
+                self.dirty >= self.FLUSH_EVERY
+                or time.monotonic() - self.lastFlush >= self.FLUSH_INTERVAL
+            ):
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self.lastFlush = time.monotonic()
+        if not self.dirty:
+            return
+        # Merge entries written by other processes since this cache was loaded
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    onDisk = orjson.loads(f.read())
+            except (OSError, orjson.JSONDecodeError) as e:
+                logger.warning(f"Could not re-read cache {self.path}: {e}")
+            else:
+                onDisk.update(self.data)
+                self.data = onDisk
+        fd, tmpPath = tempfile.mkstemp(
+            dir=os.path.dirname(self.path) or ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(orjson.dumps(self.data))
+            os.replace(tmpPath, self.path)
+        except BaseException:
+            os.unlink(tmpPath)
+            raise
+        self.dirty = 0
+
+
+_jsonCaches = {}
+_jsonCachesLock = threading.Lock()
+
+
+@atexit.register
+def _flushJsonCaches():
+    for cache in list(_jsonCaches.values()):
+        cache.flush()
 
 
 def handle_cache(file_name, key, value=None):
-    # Load existing cache or initialize an empty cache if the file does not exist
-    cache = {}
-    if os.path.exists(file_name):
-        with open(file_name, "r") as f:
-            cache = json.load(f)
+    cache = _jsonCaches.get(file_name)
+    if cache is None:
+        with _jsonCachesLock:
+            cache = _jsonCaches.setdefault(file_name, _JsonCache(file_name))
 
     if value is None:
         # Get the value from cache
         return cache.get(key)
     else:
-        # Write value to cache
-        cache[key] = value
-        with open(file_name, "w") as f:
-            json.dump(cache, f)
-
-
+        # Write value to cache; pending writes are flushed in batches and at exit
+        cache.set(key, value)
+
+
+# Medium's "?gi=..." / "&gi=..." tracking parameter, cut from there to the end
+GI_QUERY_PARAMS = ("?gi=", "&gi=")
+# Substrings that any of formatUrl's rewrites act on; urls without them are
+# returned as-is ("#" also covers "###" and discord's "#update")
+FORMAT_URL_TRIGGERS = (
+    "t.co/",
+    "medium.com",
+    "en.m.wikipedia.org",
+    "gist.github.com",
+    "?gi=",
+    "&gi=",
+    "#",
+)
+FORMAT_URL_TRIGGER_PATTERN = re.compile("|".join(map(re.escape, FORMAT_URL_TRIGGERS)))
+
+
+@functools.lru_cache(maxsize=1 << 16)
 def formatUrl(url):
     if "http" not in url:
         return url
+    url = url.strip()
+    if not FORMAT_URL_TRIGGER_PATTERN.search(url):
+        return url
     if "t.co/" in url:
-        url = urlexpander.expand(url)
-    url = url.replace("medium.com", "scribe.rip").strip()
-    url = url.replace("en.m.wikipedia.org", "en.wikipedia.org").strip()
+        url = _expandShortUrl(url).strip()
+    if "medium.com" in url:
+        url = url.replace("medium.com", "scribe.rip")
+    if "en.m.wikipedia.org" in url:
+        url = url.replace("en.m.wikipedia.org", "en.wikipedia.org")
     if "gist.github.com" in url:
-        usernameIsInUrl = len(url.split("/")) > 4
+        usernameIsInUrl = url.count("/") > 3
         if usernameIsInUrl:
-            url = "https://gist.github.com/" + url.split("/")[-1]
+            url = "https://gist.github.com/" + url.rpartition("/")[2]
 
-    url = re.sub(r"\?gi=.*", r"", url)
-    url = re.sub(r"\&gi=.*", r"", url)
+    for giParam in GI_QUERY_PARAMS:
+        giIndex = url.find(giParam)
+        if giIndex >= 0:
+            url = url[:giIndex]
     if "discord.com" in url:
         url = url.replace("#update", "")
     # remove heading tags which cause false negative duplicate detection
@@ -70,34 +176,73 @@ def formatUrl(url):
     return url
 
 
+def _expandShortUrl(url):
+    # Shortlinks never change target, so each is only resolved over the network once
+    expandedUrl = handle_cache(SHORT_URL_CACHE_FILE, url)
+    if expandedUrl is None:
+        expandedUrl = urlexpander.expand(url)
+        # urlexpander reports failures as markers like "host/__CLIENT_ERROR__";
+        # leave those uncached so the link is retried on the next run
+        if expandedUrl.startswith("http") and "_ERROR__" not in expandedUrl:
+            handle_cache(SHORT_URL_CACHE_FILE, url, expandedUrl)
+    return expandedUrl
+
+
+@functools.lru_cache(maxsize=1)
+def _getCompiledUrlPatterns():
+    # Compiled as bytes patterns so articles can be searched without decoding
+    return [
+        re.compile(urlPattern.encode("utf-8"))
+        for urlPattern in getConfig()["urlPatterns"]
+    ]
+
+
+# Articles at least this large are searched through a memory map
+URL_SEARCH_MMAP_THRESHOLD = 64 * 1024
+# Only these formats embed their source url; getUrlOfArticle returns "" for others
+URL_ARTICLE_EXTENSIONS = ("txt", "html", "mhtml")
+
+
 def getUrlOfArticle(articleFilePath):
     extractedUrl = ""
     articleExtension = os.path.splitext(articleFilePath)[1][
         1:
     ].lower()  # Remove leading dot
 
-    if articleExtension not in ["txt", "html", "mhtml"]:
+    if articleExtension not in URL_ARTICLE_EXTENSIONS:
         return ""
 
-    with open(articleFilePath, errors="ignore") as _file:
-        fileText = _file.read()
-        urlPatterns = getConfig()["urlPatterns"]
-        for urlPattern in urlPatterns:
-            match = re.search(urlPattern, fileText)
-            if match:
-                extractedUrl = formatUrl(match.group(1).strip())
-                break
+    with open(articleFilePath, "rb") as _file:
+        # Search the raw bytes (mapped for large files) rather than decoding
+        # the whole article; only the matched url is decoded
+        fileSize = os.fstat(_file.fileno()).st_size
+        if fileSize >= URL_SEARCH_MMAP_THRESHOLD:
+            fileData = mmap.mmap(_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            fileData = _file.read()
+        try:
+            for urlPattern in _getCompiledUrlPatterns():
+                match = urlPattern.search(fileData)
+                if match:
+                    url = match.group(1).decode("utf-8", errors="ignore")
+                    extractedUrl = formatUrl(url.strip())
+                    break
+        finally:
+            if isinstance(fileData, mmap.mmap):
+                fileData.close()
 
     return extractedUrl
 
 
 def getUrlsFromFile(urlFile):
-    allUrls = []
+    # Stream the lines instead of holding the whole file text and a split copy
     with open(urlFile, "r") as allUrlsFile:
-        fileText = allUrlsFile.read().strip()
-        for url in fileText.strip().split("\n"):
-            url = formatUrl(url)
-            allUrls.append(url)
+        allUrls = [
+            formatUrl(line.rstrip("\n")) for line in allUrlsFile if not line.isspace()
+        ]
+    batch = _activeUrlFileBatches.get(urlFile)
+    if batch is not None:
+        allUrls.extend(batch.pendingUrls)
     return allUrls
 
 
@@ -107,22 +252,113 @@ def removeDupesPreserveOrder(seq):
     return [x for x in seq if not (x in seen or seen_add(x))]
 
 
+URL_FILE_WRITE_BUFFER_SIZE = 1 << 20
+
+# Url files with an open UrlFileBatch, keyed by path
+_activeUrlFileBatches = {}
+
+
+class UrlFileBatch:
+    """
+    Buffers addUrlsToUrlFile calls for urlFile while the context is open.
+
+    The file is read once on entry, new unique urls are kept in memory, and only
+    those are appended on exit, instead of rewriting the whole file per call.
+    getUrlsFromFile includes the pending urls so readers stay consistent.
+    """
+
+    def __init__(self, urlFile):
+        self.urlFile = urlFile
+        self.knownUrls = set()
+        self.pendingUrls = []
+
+    def __enter__(self):
+        if os.path.exists(self.urlFile):
+            self.knownUrls = set(getUrlsFromFile(self.urlFile))
+        _activeUrlFileBatches[self.urlFile] = self
+        return self
+
+    def add(self, urlOrUrls):
+        urls = urlOrUrls if isinstance(urlOrUrls, (list, tuple)) else [urlOrUrls]
+        for url in urls:
+            url = formatUrl(url)
+            # Blank urls (e.g. for pdfs) are never read back, so never write them
+            if not url.strip():
+                continue
+            if url not in self.knownUrls:
+                self.knownUrls.add(url)
+                self.pendingUrls.append(url)
+
+    def __exit__(self, excType, excValue, traceback):
+        del _activeUrlFileBatches[self.urlFile]
+        if self.pendingUrls:
+            newText = "".join(url + "\n" for url in self.pendingUrls)
+            if _getKnownUrls(self.urlFile)[1]:
+                newText = "\n" + newText
+            with open(self.urlFile, "a") as allUrlsFile:
+                allUrlsFile.write(newText)
+            self.pendingUrls = []
+        return False
+
+
 def addUrlsToUrlFile(urlOrUrls, urlFile, overwrite=False):
+    batch = _activeUrlFileBatches.get(urlFile)
+    if batch is not None and not overwrite:
+        batch.add(urlOrUrls)
+        return
+
+    urls = urlOrUrls if isinstance(urlOrUrls, (list, tuple)) else [urlOrUrls]
+    knownUrls = set()
+    needsNewline = False
+    if not overwrite:
+        knownUrls, needsNewline = _getKnownUrls(urlFile)
+
+    newUrls = list(
+        dict.fromkeys(
+            url for url in map(formatUrl, urls) if url.strip() and url not in knownUrls
+        )
+    )
+
+    if not newUrls and not overwrite:
+        return
     mode = "w" if overwrite else "a"
-    with open(urlFile, mode) as allUrlsFile:
-        if type(urlOrUrls) == type([]):
-            for url in urlOrUrls:
-                url = formatUrl(url)
-                allUrlsFile.write(url + "\n")
-        else:
-            urlOrUrls = formatUrl(urlOrUrls)
-            allUrlsFile.write(urlOrUrls + "\n")
+    with open(urlFile, mode, buffering=URL_FILE_WRITE_BUFFER_SIZE) as allUrlsFile:
+        if needsNewline:
+            allUrlsFile.write("\n")
+        allUrlsFile.write("".join(url + "\n" for url in newUrls))
+    # Only record the urls once they are on disk; the file now holds exactly
+    # knownUrls, so later calls can skip the read
+    knownUrls.update(newUrls)
+    stat = os.stat(urlFile)
+    _knownUrlsCache[urlFile] = ((stat.st_mtime_ns, stat.st_size), knownUrls, False)
+
 
-    urls = getUrlsFromFile(urlFile)
-    uniqueUrls = removeDupesPreserveOrder(urls)
-    with open(urlFile, "w") as allUrlsFile:
-        for url in uniqueUrls:
-            allUrlsFile.write(url + "\n")
+# Formatted urls already in each url file, keyed by the file's (mtime_ns, size)
+# so repeated appends only re-read a file that something else has modified
+_knownUrlsCache = {}
+
+
+def _getKnownUrls(urlFile):
+    """Return (set of formatted urls in urlFile, whether it lacks a final newline)."""
+    try:
+        stat = os.stat(urlFile)
+    except FileNotFoundError:
+        return set(), False
+    cacheKey = (stat.st_mtime_ns, stat.st_size)
+    cached = _knownUrlsCache.get(urlFile)
+    if cached is not None and cached[0] == cacheKey:
+        return cached[1], cached[2]
+    # Read the file once and append only unseen urls, rather than appending
+    # everything and then re-reading, deduping and rewriting the whole file
+    with open(urlFile, "r") as allUrlsFile:
+        fileText = allUrlsFile.read()
+    # Skip blank lines the same way getUrlsFromFile does
+    knownUrls = {
+        formatUrl(line) for line in fileText.split("\n") if line and not line.isspace()
+    }
+    needsNewline = bool(fileText) and not fileText.endswith("\n")
+    _knownUrlsCache[urlFile] = (cacheKey, knownUrls, needsNewline)
+    return knownUrls, needsNewline
 
 
 def getTwitterAccountFromTweet(tweet_id):
@@ -155,41 +391,60 @@ def getTwitterAccountFromTweet(tweet_id):
 #     return tweet.user.username
 
 
+# (substring that selects the rule, pattern whose group 1 is the blog url), checked
+# in order; the first rule whose substring is in the url wins
+BLOG_URL_RULES = [
+    ("gist.github.com", re.compile(r"(https:\/\/gist.github.com\/.*)\/")),
+    ("https://scribe.rip", re.compile(r"(https:\/\/scribe.rip\/[^\/]*)\/")),
+    ("https://medium.com", re.compile(r"(https:\/\/medium.com\/[^\/]*)\/")),
+    (".scribe.rip", re.compile(r"(https:\/\/.*\.scribe.rip\/)")),
+    (".medium.com", re.compile(r"(https:\/\/.*\.medium.com\/)")),
+    ("https://mirror.xyz", re.compile(r"(https:\/\/mirror.xyz\/.*?)\/")),
+    ("https://write.as", re.compile(r"(https:\/\/write.as\/.*?)\/")),
+]
+TWITTER_STATUS_BLOG_PATTERN = re.compile(r"(https:\/\/twitter.com\/.*?)\/status\/.*")
+TWITTER_BLOG_PATTERN = re.compile(r"(https:\/\/twitter.com\/.*)")
+THREADREADERAPP_TWEET_PATTERN = re.compile(
+    r"https:\/\/threadreaderapp.com\/thread\/(.*)"
+)
+
+
+def _getUrlOrigin(url):
+    """String-op equivalent of matching ^(http[s]*://[^/]+); None when it would not match."""
+    scheme, separator, rest = url.partition("://")
+    if not separator or scheme.rstrip("s") != "http" or rest[:1] in ("", "/"):
+        return None
+    return scheme + separator + rest.partition("/")[0]
+
+
+@functools.lru_cache(maxsize=20000)
 def getBlogFromUrl(url):
     url = url.replace("nitter.net", "twitter.com")
-    if "https://scribe.rip" in url and url.count("/") < 4:
-        pass
-    if "gist.github.com" in url:
-        matches = re.search(r"(https:\/\/gist.github.com\/.*)\/", url)
-    elif "https://scribe.rip" in url:
-        matches = re.search(r"(https:\/\/scribe.rip\/[^\/]*)\/", url)
-    elif "https://medium.com" in url:
-        matches = re.search(r"(https:\/\/medium.com\/[^\/]*)\/", url)
-    elif ".scribe.rip" in url:
-        matches = re.search(r"(https:\/\/.*\.scribe.rip\/)", url)
-    elif ".medium.com" in url:
-        matches = re.search(r"(https:\/\/.*\.medium.com\/)", url)
-    elif "https://mirror.xyz" in url:
-        matches = re.search(r"(https:\/\/mirror.xyz\/.*?)\/", url)
-    elif "https://write.as" in url:
-        matches = re.search(r"(https:\/\/write.as\/.*?)\/", url)
-    elif "twitter.com" in url and "/status/" in url:
-        url = url.strip("/")
-        matches = re.search(r"(https:\/\/twitter.com\/.*?)\/status\/.*", url)
-    elif "twitter.com" in url and "/status/" not in url:
-        url = url.strip("/")
-        matches = re.search(r"(https:\/\/twitter.com\/.*)", url)
-    elif "https://threadreaderapp" in url:
-        matches = re.search(r"(.*)", "")
-        url = url.strip("/").replace(".html", "")
-        tweetId = re.search(r"https:\/\/threadreaderapp.com\/thread\/(.*)", url)
-        if tweetId.group(1):
-            twitterAccount = getTwitterAccountFromTweet(tweetId.group(1))
-            if twitterAccount:
-                twitterAccountUrl = "https://twitter.com/" + twitterAccount
-                matches = re.search(r"(.*)", twitterAccountUrl)
+    for substring, pattern in BLOG_URL_RULES:
+        if substring in url:
+            matches = pattern.search(url)
+            break
     else:
-        matches = re.search(r"^(http[s]*:\/\/[^\/]+)", url)
+        if "twitter.com" in url and "/status/" in url:
+            url = url.strip("/")
+            matches = TWITTER_STATUS_BLOG_PATTERN.search(url)
+        elif "twitter.com" in url and "/status/" not in url:
+            url = url.strip("/")
+            matches = TWITTER_BLOG_PATTERN.search(url)
+        elif "https://threadreaderapp" in url:
+            url = url.strip("/").replace(".html", "")
+            tweetId = THREADREADERAPP_TWEET_PATTERN.search(url)
+            twitterAccount = None
+            if tweetId.group(1):
+                twitterAccount = getTwitterAccountFromTweet(tweetId.group(1))
+            if twitterAccount:
+                return "https://twitter.com/" + twitterAccount
+            return ""
+        else:
+            # Most urls only need their origin, which is cheaper without a regex
+            origin = _getUrlOrigin(url)
+            blog = origin.strip() if origin is not None else url
+            return blog.rstrip("/")
 
     if matches:
         blog = matches.group(1).strip()
@@ -216,19 +471,26 @@ def getInvalidBlogSubstrings():
     return invalidBlogSubstrings
 
 
-def isValidBlog(url):
-    validBlog = True
+@functools.lru_cache(maxsize=1)
+def _getInvalidBlogPattern():
     invalidBlogSubstrings = getInvalidBlogSubstrings()
-    for substring in invalidBlogSubstrings:
-        if substring.lower() in url.lower():
-            validBlog = False
+    if not invalidBlogSubstrings:
+        return None
+    return _getSubstringPattern(
+        tuple(substring.lower() for substring in invalidBlogSubstrings)
+    )
+
 
+@functools.lru_cache(maxsize=20000)
+def isValidBlog(url):
     if not url.startswith("http"):
-        validBlog = False
+        return False
 
-    return validBlog
+    invalidBlogPattern = _getInvalidBlogPattern()
+    return invalidBlogPattern is None or not invalidBlogPattern.search(url.lower())
 
 
+@functools.lru_cache(maxsize=None)
 def getAbsPath(relPath):
     basepath = os.path.dirname(__file__)
     fullPath = os.path.abspath(os.path.join(basepath, relPath))
@@ -236,21 +498,40 @@ def getAbsPath(relPath):
     return fullPath
 
 
+ALREADY_ADDED_ARTICLES_FILE = getAbsPath("../storage/alreadyAddedArticles.txt")
+MARKED_AS_READ_ARTICLES_FILE = getAbsPath("../storage/markedAsReadArticles.txt")
+SHORT_URL_CACHE_FILE = getAbsPath("../storage/expandedShortUrls.json")
+
+
+@functools.lru_cache(maxsize=1)
 def getConfig():
     configFileName = getAbsPath("../config.json")
-    with open(configFileName) as config:
-        config = json.loads(config.read())
+    with open(configFileName, "rb") as config:
+        config = orjson.loads(config.read())
 
     return config
 
 
-def doesPathContainDotFolders(input_path):
-    path_obj = Path(input_path)
-    # Check all parent directories (excluding the file itself)
-    for part in path_obj.parent.parts:
-        if part and part.startswith("."):
-            return True
-    return False
+def reloadConfig():
+    """Drop the cached config and everything derived from it, then re-read it."""
+    for cachedFunction in (
+        getConfig,
+        _getCompiledUrlPatterns,
+        _getFileNamesToSkipPattern,
+        _getInvalidBlogPattern,
+        isValidBlog,
+        _getIllegalCharsTable,
+    ):
+        cachedFunction.cache_clear()
+    return getConfig()
+
+
+@functools.lru_cache(maxsize=1)
+def _getFileNamesToSkipPattern():
+    fileNamesToSkip = getConfig()["fileNamesToSkip"]
+    if not fileNamesToSkip:
+        return None
+    return _getSubstringPattern(tuple(fileNamesToSkip))
 
 
 def getArticlePaths(
@@ -272,75 +553,132 @@ def getArticlePaths(
     Returns:
         List of article paths matching the criteria
     """
-    globWildcard = "**" if recursive else "*"
     folderPath = folderPath if folderPath else getConfig()["articleFileFolder"]
     folderPath = (folderPath + "/").replace("//", "/")
     formats = getConfig()["docFormatsToMove"] if not formats else formats
-    fileNamesToSkip = getConfig()["fileNamesToSkip"]
+    skipPattern = _getFileNamesToSkipPattern()
 
-    # Treat fileName as a format if provided, otherwise use provided formats
-    search_targets = [glob.escape(fileName)] if fileName else formats
-    # Create glob patterns for both root and recursive searches
-
-    # Create the glob patterns
-    glob_patterns = [
-        *(
-            (
-                os.path.join(folderPath, globWildcard, f"{target}")
-                if recursive
-                else os.path.join(folderPath, f"{globWildcard}{target}")
-            )
-            for target in search_targets
-        ),  # Recursively
-    ]
-    final_patterns = []
-    for pattern in glob_patterns:
-        lastSegment = os.path.split(pattern)[-1]
-        if readState == "read":
-            lastSegment = f".{lastSegment}"
-        firstSegments = os.path.split(pattern)[:-1]
-        pattern = os.path.join(*firstSegments, lastSegment)
-        final_patterns.append(pattern)
-
-    glob_patterns = final_patterns
-    include_hidden = False if readState == "unread" else True
-    allArticlesPaths = []
-    for pattern in glob_patterns:
-        try:
-            matching_paths = glob.glob(
-                pattern, recursive=recursive, include_hidden=include_hidden
-            )
-            matching_paths = [
-                path for path in matching_paths if not doesPathContainDotFolders(path)
-            ]
-            allArticlesPaths.extend(matching_paths)
-        except Exception as e:
-            logger.error(f"Error in glob pattern {pattern}: {e}")
-
-    allArticlesPaths = [
-        path
-        for path in allArticlesPaths
-        if not any(skip in path for skip in fileNamesToSkip)
-    ]
+    if not recursive:
+        allArticlesPaths = _scanFolderForArticles(
+            folderPath, [fileName] if fileName else formats, readState
+        )
+    else:
+        allArticlesPaths = _walkFolderForArticles(
+            folderPath, [fileName] if fileName else formats, readState
+        )
+
+    subjectsPattern = None
     if subjects:
-        allArticlesPaths = [
-            path for path in allArticlesPaths if checkArticleSubject(path, subjects)
-        ]
-    allArticlesPaths = list(set(allArticlesPaths))
-    return allArticlesPaths
+        # Case-insensitive substring match on the whole path, so subjects can also
+        # filter by file name (e.g. to find yt videos)
+        subjectsPattern = _getSubstringPattern(
+            tuple(subject.lower() for subject in subjects)
+        )
+    # Filter straight into a set so duplicates are never held or re-filtered
+    articlePaths = set()
+    for path in allArticlesPaths:
+        if skipPattern is not None and skipPattern.search(path):
+            continue
+        if subjectsPattern is not None and not subjectsPattern.search(path.lower()):
+            continue
+        articlePaths.add(path)
+    return list(articlePaths)
+
+
+def _scanFolderForArticles(folderPath, nameSuffixes, readState):
+    """
+    Single-scandir equivalent of globbing folderPath for "*{suffix}" per suffix.
+
+    Read articles are hidden (dot-prefixed) files: readState "read" keeps only
+    those, "unread" drops them, and anything else keeps both.
+    """
+    # Articles under dot folders are skipped; without recursion the only folders
+    # on the path are those in folderPath itself
+    if any(part.startswith(".") for part in Path(folderPath).parts):
+        return []
+    nameSuffixes = tuple(nameSuffixes)
+    onlyRead = readState == "read"
+    onlyUnread = readState == "unread"
+    matchingPaths = []
+    try:
+        with os.scandir(folderPath) as entries:
+            for entry in entries:
+                name = entry.name
+                isRead = name.startswith(".")
+                if onlyRead:
+                    if not isRead or not name[1:].endswith(nameSuffixes):
+                        continue
+                elif (onlyUnread and isRead) or not name.endswith(nameSuffixes):
+                    continue
+                matchingPaths.append(entry.path)
+    except OSError as e:
+        logger.error(f"Error scanning folder {folderPath}: {e}")
+    return matchingPaths
+
+
+def _walkFolderForArticles(folderPath, targets, readState):
+    """
+    Single-walk equivalent of globbing folderPath + "**/{target}" per target.
+
+    Like those patterns, targets are matched as whole entry names (with a "."
+    prefix for readState "read"). Dot folders are pruned while descending
+    rather than filtered out of the results afterwards.
+    """
+    if any(part.startswith(".") for part in Path(folderPath).parts):
+        return []
+    prefix = "." if readState == "read" else ""
+    targetNames = {prefix + target for target in targets}
+    matchingPaths = []
+    pendingFolders = [folderPath]
+    while pendingFolders:
+        try:
+            with os.scandir(pendingFolders.pop()) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name in targetNames:
+                        matchingPaths.append(entry.path)
+                    if not name.startswith(".") and entry.is_dir():
+                        pendingFolders.append(entry.path)
+        except OSError as e:
+            logger.error(f"Error scanning folder: {e}")
+    return matchingPaths
+
+
+# Reading each article dominates getArticleUrls, so overlap the reads; more
+# workers keep more reads in flight. Default, can be overridden by config
+URL_EXTRACTION_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+
+def getUrlsOfArticles(articlePaths):
+    """Return {articlePath: getUrlOfArticle(articlePath)}, reading articles concurrently."""
+    articleUrls = {}
+    urlArticlePaths = []
+    for articlePath in articlePaths:
+        # Other formats (pdfs, epubs, ...) never carry a url, so they are answered
+        # here instead of being queued on the pool
+        articleExtension = os.path.splitext(articlePath)[1][1:].lower()
+        if articleExtension in URL_ARTICLE_EXTENSIONS:
+            urlArticlePaths.append(articlePath)
+        articleUrls[articlePath] = ""
+    if not urlArticlePaths:
+        return articleUrls
+    maxWorkers = getConfig().get("urlExtractionWorkers", URL_EXTRACTION_WORKERS)
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        articleUrls.update(
+            zip(urlArticlePaths, executor.map(getUrlOfArticle, urlArticlePaths))
+        )
+    return articleUrls
 
 
 def getArticleUrls(subjects=[], readState=""):
-    matchingArticles = {}
     allArticlesPaths = getArticlePaths(
         ["html", "mhtml"], "", readState=readState, subjects=subjects
     )
-    for articlePath in allArticlesPaths:
-        articleUrl = getUrlOfArticle(articlePath)
-        if articleUrl:
-            matchingArticles[articlePath] = articleUrl
-
-    return matchingArticles
+    return {
+        articlePath: articleUrl
+        for articlePath, articleUrl in getUrlsOfArticles(allArticlesPaths).items()
+        if articleUrl
+    }
 
 
 def getSrcUrlOfGitbook(articlePath):
@@ -352,6 +690,9 @@ def getSrcUrlOfGitbook(articlePath):
     return None
 
 
+IPFS_HASH_CHUNK_SIZE = 1 << 20
+
+
 def calculate_ipfs_hash(file_path):
     """Calculate IPFS hash for a file."""
 
@@ -360,48 +701,66 @@ def calculate_ipfs_hash(file_path):
             yield chunk
 
     with open(file_path, "rb") as f:
-        # Use a larger chunk size for better performance (64KB instead of 4 bytes)
-        result = cid_sha256_hash_chunked(as_chunks(f, 65536))
-        return result
+        stat = os.fstat(f.fileno())
+        cacheKey = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        cachedHash = _ipfsHashCache.get(cacheKey)
+        if cachedHash is not None:
+            return cachedHash
+        # Hash the whole file in one update over a memory map; the digest does not
+        # depend on chunking. mmap rejects empty files, so fall back to reads
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    fileHash = cid_sha256_hash(view)
+        except (ValueError, OSError):
+            f.seek(0)
+            fileHash = cid_sha256_hash_chunked(as_chunks(f, IPFS_HASH_CHUNK_SIZE))
+    _ipfsHashCache[cacheKey] = fileHash
+    return fileHash
 
 
-def calculate_normal_hash(file_path):
-    hasher = hashlib.sha256()
-    file_size = os.path.getsize(file_path)
+# Hashes keyed by (absolute path, mtime_ns, size) so a file that is unchanged is
+# only hashed once per run, however many passes over the folder hash it
+_normalHashCache = {}
+_ipfsHashCache = {}
 
-    if file_size < 4096:
-        with open(file_path, "rb") as f:
-            hasher.update(f.read())
-    else:
-        offset = (file_size - 4096) // 2
-        with open(file_path, "rb") as f:
-            f.seek(offset)
-            hasher.update(f.read(4096))
 
-    return hasher.hexdigest()
+def calculate_normal_hash(file_path):
+    stat = os.stat(file_path)
+    cacheKey = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    cachedHash = _normalHashCache.get(cacheKey)
+    if cachedHash is not None:
+        return cachedHash
+
+    # Only a 4 KiB sample from the middle of the file is hashed, so SHA-256 CPU
+    # time is negligible next to the I/O; one pread replaces the seek + read
+    file_size = stat.st_size
+    offset = max(0, (file_size - 4096) // 2)
+    with open(file_path, "rb") as f:
+        sample = os.pread(f.fileno(), 4096, offset)
+
+    fileHash = hashlib.sha256(sample).hexdigest()
+    _normalHashCache[cacheKey] = fileHash
+    return fileHash
 
 
 def get_directory_snapshot(directory_path):
-    """Get a snapshot of all files in a directory with their modification times."""
+    """Get a snapshot of all files in a directory as {path: (size, mtime)}."""
     snapshot = {}
     try:
-        # Since all files are in root directory, use os.listdir instead of os.walk
-        for filename in os.listdir(directory_path):
-            file_path = os.path.join(directory_path, filename)
-
-            # Skip if not a file
-            if not os.path.isfile(file_path):
-                continue
-
-            try:
-                stat = os.stat(file_path)
-                snapshot[file_path] = {
-                    "size": stat.st_size,
-                    "mtime": stat.st_mtime,
-                }
-            except (OSError, FileNotFoundError):
-                # File might have been deleted between listdir and stat
-                continue
+        # Since all files are in root directory, use os.scandir instead of os.walk
+        with os.scandir(directory_path) as entries:
+            for entry in entries:
+                try:
+                    # Skip if not a file
+                    if not entry.is_file():
+                        continue
+
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_size, stat.st_mtime)
+                except (OSError, FileNotFoundError):
+                    # File might have been deleted between scandir and stat
+                    continue
     except FileNotFoundError:
         logger.warning(f"Directory not found: {directory_path}")
     return snapshot
@@ -409,16 +768,18 @@ def get_directory_snapshot(directory_path):
 
 def log_directory_diff(before_snapshot, after_snapshot, directory_name):
     """Log the differences between two directory snapshots."""
-    added_files = set(after_snapshot.keys()) - set(before_snapshot.keys())
-    removed_files = set(before_snapshot.keys()) - set(after_snapshot.keys())
+    added_files = []
     modified_files = []
-
-    for file_path in set(before_snapshot.keys()) & set(after_snapshot.keys()):
-        if (
-            before_snapshot[file_path]["size"] != after_snapshot[file_path]["size"]
-            or before_snapshot[file_path]["mtime"] != after_snapshot[file_path]["mtime"]
-        ):
+    # One pass over the after snapshot classifies added and modified files
+    for file_path, after_stat in after_snapshot.items():
+        before_stat = before_snapshot.get(file_path)
+        if before_stat is None:
+            added_files.append(file_path)
+        elif before_stat != after_stat:
             modified_files.append(file_path)
+    removed_files = [
+        file_path for file_path in before_snapshot if file_path not in after_snapshot
+    ]
 
     if added_files or removed_files or modified_files:
         logger.info(f"=== {directory_name} Directory Changes ===")
@@ -443,41 +804,86 @@ def log_directory_diff(before_snapshot, after_snapshot, directory_name):
         logger.info(f"No changes detected in {directory_name}")
 
 
-def removeIllegalChars(pdfTitle):
+@functools.lru_cache(maxsize=1)
+def _getIllegalCharsTable():
+    # Single characters are dropped in one translate pass; any longer entries
+    # still need str.replace, applied before the translate pass
     illegalChars = getConfig()["illegalFileNameChars"]
-    for char in illegalChars:
-        pdfTitle = pdfTitle.replace(char, "")
+    singleChars = "".join(char for char in illegalChars if len(char) == 1)
+    longerEntries = tuple(char for char in illegalChars if len(char) > 1)
+    return str.maketrans("", "", singleChars), longerEntries
+
+
+def removeIllegalChars(pdfTitle):
+    table, longerEntries = _getIllegalCharsTable()
+    for entry in longerEntries:
+        pdfTitle = pdfTitle.replace(entry, "")
+    return pdfTitle.translate(table)
+
 
-    return pdfTitle
+ATOM_NAMESPACES = {"atom": "http://www.w3.org/2005/Atom"}
 
+# Shared keep-alive session for the paper metadata APIs
+_PAPER_API_SESSION = requests.Session()
+_paperApiAdapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+_PAPER_API_SESSION.mount("https://", _paperApiAdapter)
+_PAPER_API_SESSION.mount("http://", _paperApiAdapter)
+PAPER_TITLE_ERROR = "Error: Could not retrieve paper information"
 
+
+def _diskCachedTitle(cacheFile):
+    """Persist successful paper title lookups in cacheFile across runs."""
+
+    def decorator(getTitle):
+        @functools.wraps(getTitle)
+        def wrapper(paperId):
+            title = handle_cache(cacheFile, paperId)
+            if title is None:
+                title = getTitle(paperId)
+                # Errors are not cached so failed lookups are retried next run
+                if title != PAPER_TITLE_ERROR:
+                    handle_cache(cacheFile, paperId, title)
+            return title
+
+        return wrapper
+
+    return decorator
+
+
+@functools.lru_cache(maxsize=4096)
+@_diskCachedTitle(getAbsPath("../storage/arxivTitles.json"))
 def getArxivTitle(arxiv_id):
     # Make a request to the arXiv API to get the metadata for the paper
     logger.info(f"Getting arXiv title for: {arxiv_id}")
-    res = requests.get(f"http://export.arxiv.org/api/query?id_list={arxiv_id}")
+    res = _PAPER_API_SESSION.get(
+        f"http://export.arxiv.org/api/query?id_list={arxiv_id}", timeout=10
+    )
 
     # Check if the request was successful
     if res.status_code != 200:
-        return "Error: Could not retrieve paper information"
+        return PAPER_TITLE_ERROR
 
-    # Extract the title from the response
-    data = res.text.replace("\n", "").replace("\t", "")
-    # print(data)
-    start = data.index("</published>    <title>") + len("</published>    <title>")
-    end = data.index("</title>    <summary>")
-    # print(start, end)
-    title = data[start:end]
-    return title
+    # Extract the entry title from the Atom response
+    root = ET.fromstring(res.content)
+    titleElement = root.find("atom:entry/atom:title", ATOM_NAMESPACES)
+    if titleElement is None or not titleElement.text:
+        return PAPER_TITLE_ERROR
+    # Titles are wrapped across lines in the feed, so collapse the whitespace
+    return " ".join(titleElement.text.split())
 
 
+@functools.lru_cache(maxsize=4096)
+@_diskCachedTitle(getAbsPath("../storage/doiTitles.json"))
 def getDOITitle(doi):
     # Make a request to the CrossRef API to get the metadata for the paper
     headers = {"Accept": "application/json"}
-    res = requests.get(f"https://api.crossref.org/v1/works/{doi}", headers=headers)
+    res = _PAPER_API_SESSION.get(
+        f"https://api.crossref.org/v1/works/{doi}", headers=headers, timeout=10
+    )
 
     # Check if the request was successful
     if res.status_code != 200:
-        return "Error: Could not retrieve paper information"
+        return PAPER_TITLE_ERROR
 
     # Extract the title from the response
     data = res.json()
@@ -485,9 +891,12 @@ def getDOITitle(doi):
     return title
 
 
+ARXIV_ID_PATTERN = re.compile(r"^\d+\.\d+$")
+
+
 def get_id_type(paper_id):
     # Check if the given string is a valid arXiv ID
-    if re.match(r"^\d+\.\d+$", paper_id):
+    if ARXIV_ID_PATTERN.match(paper_id):
         return "arxiv"
 
     # Check if the given string is a valid DOI